@@ -3,107 +3,124 @@ AI-Powered Financial Insights Generator
 Uses Claude/OpenAI to generate natural language insights from analytics
 """
 
-import json
-from typing import Dict, Optional
-import os
-from anthropic import Anthropic
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
+import asyncio
+import hashlib
+import orjson
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
 from app import config
-from google import genai
+from app.file_utils import write_text
+from app.answer_cache import AnswerCache, report_hash
+
+
+def prompt_json(obj) -> str:
+    """Compact, key-sorted JSON for embedding in prompts (stable across calls)"""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY, default=str).decode()
+
+
+def read_cached_text(path) -> Optional[str]:
+    """Contents of a cache file, or None if it doesn't exist or is empty"""
+    try:
+        return path.read_text() or None
+    except FileNotFoundError:
+        return None
+
+
+INSIGHTS_PROMPT = """Provide a comprehensive financial analysis of the client's bank statement in markdown format with these sections:
+
+1. **Executive Summary** (2-3 sentences overview)
+2. **Key Insights** (3-5 bullet points of most important findings)
+3. **Spending Breakdown** (analysis of category spending)
+4. **Recurring Payments** (identify subscriptions and regular expenses)
+5. **Unusual Activity** (flag any concerning transactions)
+6. **Recommendations** (3-5 actionable suggestions to improve financial health)
+7. **Financial Forecast** (predict next month based on current patterns)
+
+Be specific with numbers, percentages, and actionable advice.
+Tone: Friendly but professional, like a financial advisor talking to a friend.
+"""
+
+# Serialized report prompts kept in memory per agent (most recently used)
+REPORT_BLOCK_CACHE_SIZE = 8
+
+# Bump to invalidate cached insights after changing how they are generated
+INSIGHTS_CACHE_VERSION = 1
+
+QUESTION_PROMPT = """User question: {question}
+
+Provide a clear, specific answer based on the data. Include numbers and percentages where relevant.
+"""
+
 
 class FinancialInsightsAgent:
     """Generates human-readable financial insights using AI"""
     
-    def __init__(self, provider: str = "claude"):
+    def __init__(self, provider: str = "claude", cache: Optional[AnswerCache] = None):
         """
         Initialize AI agent
         
         Args:
             provider: 'claude', 'openai', or 'groq'
+            cache: Answer cache for answer_question (defaults to an on-disk AnswerCache)
         """
         self.provider = provider
+        self.cache = cache if cache is not None else AnswerCache(str(config.CACHE_DIR / "qa_cache.json"))
         
+        # Serialized report blocks keyed by report hash, so every call about the
+        # same report sends a byte-identical (and therefore cacheable) prefix.
+        # Bounded LRU: the agent lives as long as the server
+        self._report_blocks: "OrderedDict[str, str]" = OrderedDict()
+        
+        # SDKs are imported lazily so only the selected provider is loaded
         if provider == "claude":
-            self.client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+            from anthropic import AsyncAnthropic
+            self.client = AsyncAnthropic(api_key=config.ANTHROPIC_API_KEY)
             self.model = "claude-sonnet-4-20250514"
         elif provider == "openai":
-            self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            from openai import AsyncOpenAI
+            self.client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
             self.model = "gpt-4o-mini"
         elif provider == "groq":
-            from groq import Groq
-            self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+            from groq import AsyncGroq
+            self.client = AsyncGroq(api_key=config.GROQ_API_KEY)
             self.model = "openai/gpt-oss-120b"
         elif provider == "gemini":
+            from google import genai
             self.client = genai.Client(api_key=config.GEMINI_API_KEY)
             self.model = config.MODELS["gemini"]
+        
+        # Q&A over structured data is simpler than the full analysis; use a smaller model
+        self.qa_model = config.QA_MODELS.get(provider, getattr(self, "model", None))
     
-    def generate_insights(self, financial_report: Dict) -> str:
+    async def generate_insights(self, financial_report: Dict, use_cache: bool = True) -> str:
         """
         Generate natural language insights from financial report
         
         Args:
             financial_report: Output from FinancialAnalyzer.generate_full_report()
+            use_cache: Reuse insights previously generated for an identical report
             
         Returns:
             Formatted markdown insights
         """
         
-        prompt = f"""You are a personal financial advisor analyzing a client's bank statement.
-
-Here is the financial data:
-
-{json.dumps(financial_report, indent=2)}
-
-Provide a comprehensive financial analysis in markdown format with these sections:
-
-1. **Executive Summary** (2-3 sentences overview)
-2. **Key Insights** (3-5 bullet points of most important findings)
-3. **Spending Breakdown** (analysis of category spending)
-4. **Recurring Payments** (identify subscriptions and regular expenses)
-5. **Unusual Activity** (flag any concerning transactions)
-6. **Recommendations** (3-5 actionable suggestions to improve financial health)
-7. **Financial Forecast** (predict next month based on current patterns)
-
-Be specific with numbers, percentages, and actionable advice.
-Tone: Friendly but professional, like a financial advisor talking to a friend.
-"""
+        report_key = report_hash(financial_report)
+        cache_path = self._insights_cache_path(report_key)
+        cached = await asyncio.to_thread(read_cached_text, cache_path) if use_cache else None
+        if cached is not None:
+            return cached
         
-        if self.provider == "claude":
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
+        prompt = INSIGHTS_PROMPT
         
-        elif self.provider == "openai":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.choices[0].message.content
+        system = self._report_block(financial_report, report_key)
+        insights = await self._complete(system, prompt, max_tokens=2048)
         
-        elif self.provider == "groq":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.choices[0].message.content
-        
-        elif self.provider == "gemini":
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
-            return response.text
-        
-        else:
-            raise ValueError(f"Unknown provider: {self.provider}")
+        # Never cache an empty response; it would be served for this report forever
+        if insights:
+            await asyncio.to_thread(write_text, cache_path, insights)
+        return insights
     
-    def answer_question(self, question: str, financial_report: Dict) -> str:
+    async def answer_question(self, question: str, financial_report: Dict) -> str:
         """
         Answer specific questions about finances
         
@@ -111,46 +128,168 @@ Tone: Friendly but professional, like a financial advisor talking to a friend.
         - "How much did I spend on food this month?"
         - "What are my biggest expenses?"
         - "Am I saving enough?"
+        
+        Repeated questions about the same report are answered from cache.
         """
         
-        prompt = f"""You are a financial advisor with access to the following financial data:
-
-{json.dumps(financial_report, indent=2)}
+        report_key = report_hash(financial_report)
+        cached = self.cache.lookup(question, report_key)
+        if cached is not None:
+            return cached
+        
+        prompt = QUESTION_PROMPT.format(question=question)
+        
+        system = self._report_block(financial_report, report_key)
+        answer = await self._complete(system, prompt, max_tokens=1024, model=self.qa_model)
+        await asyncio.to_thread(self.cache.store, question, report_key, answer)
+        return answer
+    
+    async def stream_insights(self, financial_report: Dict, use_cache: bool = True) -> AsyncIterator[str]:
+        """Like generate_insights, but yields text chunks as the model produces them"""
+        report_key = report_hash(financial_report)
+        cache_path = self._insights_cache_path(report_key)
+        cached = await asyncio.to_thread(read_cached_text, cache_path) if use_cache else None
+        if cached is not None:
+            yield cached
+            return
+        
+        system = self._report_block(financial_report, report_key)
+        chunks = []
+        async for chunk in self._stream(system, INSIGHTS_PROMPT, max_tokens=2048):
+            chunks.append(chunk)
+            yield chunk
+        
+        insights = "".join(chunks)
+        if insights:
+            await asyncio.to_thread(write_text, cache_path, insights)
+    
+    async def stream_answer(self, question: str, financial_report: Dict) -> AsyncIterator[str]:
+        """Like answer_question, but yields text chunks as the model produces them"""
+        report_key = report_hash(financial_report)
+        cached = self.cache.lookup(question, report_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        system = self._report_block(financial_report, report_key)
+        chunks = []
+        async for chunk in self._stream(system, QUESTION_PROMPT.format(question=question), max_tokens=1024, model=self.qa_model):
+            chunks.append(chunk)
+            yield chunk
+        
+        await asyncio.to_thread(self.cache.store, question, report_key, "".join(chunks))
+    
+    async def generate_insights_batch(self, financial_reports: List[Dict]) -> List[str]:
+        """Generate insights for several reports concurrently"""
+        return await asyncio.gather(
+            *[self.generate_insights(report) for report in financial_reports]
+        )
+    
+    async def answer_questions(self, questions: List[str], financial_report: Dict) -> List[str]:
+        """Answer several questions about the same report concurrently"""
+        return await asyncio.gather(
+            *[self.answer_question(question, financial_report) for question in questions]
+        )
+    
+    def _insights_cache_path(self, report_key: str):
+        """Insights cache file for a report, specific to provider, model and prompt"""
+        generator = f"{INSIGHTS_CACHE_VERSION}:{self.provider}:{getattr(self, 'model', None)}:{INSIGHTS_PROMPT}"
+        generator_key = hashlib.sha1(generator.encode("utf-8")).hexdigest()[:12]
+        return config.CACHE_DIR / f"insights_{report_key}_{generator_key}.md"
+    
+    def _report_block(self, financial_report: Dict, report_key: str) -> str:
+        """Static system prompt carrying the report, built once per recent report"""
+        if report_key in self._report_blocks:
+            self._report_blocks.move_to_end(report_key)
+        else:
+            if len(self._report_blocks) >= REPORT_BLOCK_CACHE_SIZE:
+                self._report_blocks.popitem(last=False)
+            self._report_blocks[report_key] = f"""You are a personal financial advisor with access to a client's bank statement analysis.
 
-User question: {question}
+Here is the financial data:
 
-Provide a clear, specific answer based on the data. Include numbers and percentages where relevant.
+{prompt_json(financial_report)}
 """
+        return self._report_blocks[report_key]
+    
+    async def _complete(self, system: str, prompt: str, max_tokens: int, model: Optional[str] = None) -> str:
+        """
+        Send a prompt to the configured provider.
+        
+        The large, static system block comes first so provider-side prompt
+        caching can reuse it across calls; only the short user turn varies.
+        Defaults to the agent's main model.
+        """
+        model = model or self.model
         
         if self.provider == "claude":
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
+            response = await self.client.messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                system=[{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}],
                 messages=[{"role": "user", "content": prompt}]
             )
             return response.content[0].text
         
-        elif self.provider == "openai":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
+        elif self.provider in ("openai", "groq"):
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt}
+                ]
             )
             return response.choices[0].message.content
         
-        elif self.provider == "groq":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
+        elif self.provider == "gemini":
+            response = await self.client.aio.models.generate_content(
+                model=model,
+                contents=prompt,
+                config={"system_instruction": system}
             )
-            return response.choices[0].message.content
+            return response.text
+        
+        else:
+            raise ValueError(f"Unknown provider: {self.provider}")
 
+    
+    async def _stream(self, system: str, prompt: str, max_tokens: int, model: Optional[str] = None) -> AsyncIterator[str]:
+        """Streaming counterpart of _complete"""
+        model = model or self.model
+        
+        if self.provider == "claude":
+            async with self.client.messages.stream(
+                model=model,
+                max_tokens=max_tokens,
+                system=[{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}],
+                messages=[{"role": "user", "content": prompt}]
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+        
+        elif self.provider in ("openai", "groq"):
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt}
+                ],
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        
         elif self.provider == "gemini":
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
+            stream = await self.client.aio.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config={"system_instruction": system}
             )
-            return response.text
-            
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        
         else:
             raise ValueError(f"Unknown provider: {self.provider}")
 
@@ -165,7 +304,7 @@ if __name__ == "__main__":
     
     # Generate AI insights
     agent = FinancialInsightsAgent(provider="claude")
-    insights = agent.generate_insights(report)
+    insights = asyncio.run(agent.generate_insights(report))
     
     print(insights)
     
@@ -3,115 +3,206 @@ Financial Analytics Engine
 Performs quantitative analysis on transaction data
 """
 
+import numpy as np
 import pandas as pd
-import json
+import hashlib
+import orjson
 from datetime import datetime
 from typing import Dict, List, Tuple
 from collections import defaultdict
 import re
 
+from app import config
+from app.file_utils import atomic_write_bytes
+
+# Bump when categorization or the report layout changes, so cached reports
+# built by older code are not served
+REPORT_VERSION = 2
+
+# Keyword lists per category, checked in order (first matching category wins).
+# Keywords match whole words; multi-word keywords need all of their words.
+CATEGORIES = {
+    'Food & Dining': ['swiggy', 'zomato', 'restaurant', 'food', 'cafe', 'domino', 'dominos', 'mcdonald', 'mcdonalds', 'kfc'],
+    'Shopping': ['amazon', 'flipkart', 'myntra', 'ajio', 'shop', 'mall', 'store'],
+    'Transportation': ['uber', 'ola', 'rapido', 'petrol', 'fuel', 'parking'],
+    'Utilities': ['electricity', 'water', 'gas', 'internet', 'mobile', 'recharge', 'jio', 'airtel'],
+    'Investment': ['groww', 'zerodha', 'upstox', 'mutual fund', 'sip', 'investment'],
+    'Entertainment': ['netflix', 'prime', 'hotstar', 'spotify', 'movie', 'theatre', 'book', 'bookmyshow'],
+    'Healthcare': ['medical', 'pharmacy', 'hospital', 'doctor', 'medicine', 'health'],
+    'Transfer': ['neft', 'imps', 'rtgs', 'transfer', 'upi-.*rao'],
+    'Salary': ['salary', 'nextbillion', 'payroll'],
+    'Bills': ['bill', 'payment', 'autopay'],
+    'Other': []
+}
+
+CATEGORY_NAMES = list(CATEGORIES)
+
+OTHER_ID = CATEGORY_NAMES.index('Other')
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Per category (in priority order): single-word keywords as one token set, and
+# multi-word keywords as token sets that must all be present
+_KEYWORD_TOKENS = [[frozenset(TOKEN_RE.findall(kw)) for kw in kws] for kws in CATEGORIES.values()]
+CATEGORY_TOKENS = [frozenset().union(*(k for k in kws if len(k) == 1)) for kws in _KEYWORD_TOKENS]
+CATEGORY_PHRASES = [[k for k in kws if len(k) > 1] for kws in _KEYWORD_TOKENS]
+
+
+def categorize_tokens(tokens: frozenset) -> int:
+    """Index of the first category with a keyword among the tokens"""
+    for idx, (words, phrases) in enumerate(zip(CATEGORY_TOKENS, CATEGORY_PHRASES)):
+        if words & tokens or any(phrase <= tokens for phrase in phrases):
+            return idx
+    return OTHER_ID
+
+
+def _json_default(obj):
+    """JSON fallback for pandas/datetime values in reports"""
+    if obj is pd.NaT:
+        return None
+    if hasattr(obj, 'strftime'):
+        return obj.strftime('%Y-%m-%d')
+    return str(obj)
+
 
 class FinancialAnalyzer:
     """Analyzes bank statement transactions"""
     
     def __init__(self, transactions_json_path: str):
         """Load transactions from JSON file"""
-        with open(transactions_json_path, 'r') as f:
-            data = json.load(f)
+        with open(transactions_json_path, 'rb') as f:
+            raw = f.read()
+        data = orjson.loads(raw)
+        
+        # Content fingerprint used to key the on-disk report cache
+        self.fingerprint = hashlib.sha1(raw).hexdigest()
         
         self.statement_data = data
         self.transactions = data['transactions']
         self.df = pd.DataFrame(self.transactions)
         
-        # Convert date strings to datetime
-        self.df['date'] = pd.to_datetime(self.df['date'], format='%d/%m/%Y', errors='coerce')
+        # Convert date strings to datetime; strict parse first (the common, clean
+        # case), coercing bad rows to NaT only if that fails
+        try:
+            self.df['date'] = pd.to_datetime(self.df['date'], format='%d/%m/%Y', exact=True, cache=True)
+        except (ValueError, TypeError):
+            self.df['date'] = pd.to_datetime(self.df['date'], format='%d/%m/%Y', errors='coerce', cache=True)
         
         # Fill NaN values
         self.df['withdrawal'] = self.df['withdrawal'].fillna(0)
         self.df['deposit'] = self.df['deposit'].fillna(0)
+        
+        # Lowercased descriptions, computed once and shared by all text matching
+        self.df['desc_lower'] = self.df['description'].fillna('').str.lower()
+        
+        # Column arrays for the numeric hot paths (the DataFrame is kept for row output)
+        self._withdrawal = self.df['withdrawal'].to_numpy(dtype=np.float64)
+        self._deposit = self.df['deposit'].to_numpy(dtype=np.float64)
+        self._days = self.df['date'].to_numpy(dtype='datetime64[D]')
+        self._category_ids = None
+        self._stats = None
     
     def categorize_transactions(self) -> pd.DataFrame:
         """
         Auto-categorize transactions using keyword matching.
         Returns DataFrame with added 'category' column.
         """
-        categories = {
-            'Food & Dining': ['swiggy', 'zomato', 'restaurant', 'food', 'cafe', 'domino', 'mcdonald', 'kfc'],
-            'Shopping': ['amazon', 'flipkart', 'myntra', 'ajio', 'shop', 'mall', 'store'],
-            'Transportation': ['uber', 'ola', 'rapido', 'petrol', 'fuel', 'parking'],
-            'Utilities': ['electricity', 'water', 'gas', 'internet', 'mobile', 'recharge', 'jio', 'airtel'],
-            'Investment': ['groww', 'zerodha', 'upstox', 'mutual fund', 'sip', 'investment'],
-            'Entertainment': ['netflix', 'prime', 'hotstar', 'spotify', 'movie', 'theatre', 'book'],
-            'Healthcare': ['medical', 'pharmacy', 'hospital', 'doctor', 'medicine', 'health'],
-            'Transfer': ['neft', 'imps', 'rtgs', 'transfer', 'upi-.*rao'],
-            'Salary': ['salary', 'nextbillion', 'payroll'],
-            'Bills': ['bill', 'payment', 'autopay'],
-            'Other': []
+        # Tokenize each distinct description once and map the result back
+        lookup = {
+            desc: categorize_tokens(frozenset(TOKEN_RE.findall(desc)))
+            for desc in self.df['desc_lower'].unique()
         }
         
-        def categorize(description: str) -> str:
-            if pd.isna(description):
-                return 'Other'
-            
-            desc_lower = description.lower()
-            
-            for category, keywords in categories.items():
-                if category == 'Other':
-                    continue
-                for keyword in keywords:
-                    if keyword in desc_lower:
-                        return category
-            
-            return 'Other'
-        
-        self.df['category'] = self.df['description'].apply(categorize)
+        self._category_ids = self.df['desc_lower'].map(lookup).to_numpy(dtype=np.int16)
+        self.df['category'] = np.asarray(CATEGORY_NAMES, dtype=object)[self._category_ids]
+        self._stats = None
         return self.df
     
-    def spending_by_category(self) -> Dict[str, float]:
-        """Calculate total spending per category"""
-        if 'category' not in self.df.columns:
+    def _aggregates(self) -> Dict:
+        """
+        Column aggregates shared by the report sections.
+        
+        Totals, per-category and per-day sums, and mean/std of withdrawals are
+        computed together from the column arrays and memoized, so each report
+        section reads small precomputed values instead of rescanning columns.
+        """
+        if self._stats is not None:
+            return self._stats
+        
+        if self._category_ids is None:
             self.categorize_transactions()
         
-        spending = self.df.groupby('category')['withdrawal'].sum().to_dict()
-        return {k: round(v, 2) for k, v in spending.items() if v > 0}
+        w = self._withdrawal
+        valid = ~np.isnat(self._days)
+        unique_days, day_ids = np.unique(self._days[valid], return_inverse=True)
+        
+        self._stats = {
+            'total_withdrawal': w.sum(),
+            'total_deposit': self._deposit.sum(),
+            'category_totals': np.bincount(self._category_ids, weights=w, minlength=len(CATEGORY_NAMES)),
+            'days': unique_days,
+            'day_totals': np.bincount(day_ids, weights=w[valid], minlength=len(unique_days)),
+            # Distinct dates, counting missing dates once (as pandas unique() does)
+            'date_count': len(unique_days) + (0 if valid.all() else 1),
+            # Sample std (ddof=1) to match pandas
+            'mean': w.mean() if len(w) else 0.0,
+            'std': w.std(ddof=1) if len(w) > 1 else 0.0
+        }
+        return self._stats
+    
+    def spending_by_category(self) -> Dict[str, float]:
+        """Calculate total spending per category"""
+        totals = self._aggregates()['category_totals']
+        return {k: round(v, 2) for k, v in sorted(zip(CATEGORY_NAMES, totals)) if v > 0}
     
     def top_expenses(self, n: int = 10) -> List[Dict]:
         """Get top N expenses"""
-        top = self.df.nlargest(n, 'withdrawal')[['date', 'description', 'withdrawal']]
+        w = self._withdrawal
+        n = min(n, len(w))
+        if n <= 0:
+            return []
+        
+        # O(N) selection of the top n, matching nlargest(keep='first'): every row
+        # above the cutoff value, then the earliest rows tied at the cutoff
+        cutoff = np.partition(w, len(w) - n)[len(w) - n]
+        above = np.flatnonzero(w > cutoff)
+        tied = np.flatnonzero(w == cutoff)[:n - len(above)]
+        idx = np.concatenate([above, tied])
+        idx.sort()
+        idx = idx[np.argsort(-w[idx], kind='stable')]
+        
+        top = self.df.iloc[idx][['date', 'description', 'withdrawal']]
         return top.to_dict('records')
     
     def recurring_payments(self) -> List[Dict]:
         """Detect recurring payments (same merchant, regular intervals)"""
-        # Group by similar descriptions
-        recurring = []
-        
-        for desc in self.df['description'].unique():
-            if pd.isna(desc):
-                continue
-            
-            # Extract merchant name (before @ or first 30 chars)
-            merchant = desc.split('@')[0][:30]
-            matching = self.df[self.df['description'].str.contains(merchant, case=False, na=False)]
-            
-            if len(matching) >= 2:  # At least 2 occurrences
-                total = matching['withdrawal'].sum()
-                avg = matching['withdrawal'].mean()
-                
-                if total > 0:  # Only withdrawals
-                    recurring.append({
-                        'merchant': merchant,
-                        'frequency': len(matching),
-                        'total_spent': round(total, 2),
-                        'avg_amount': round(avg, 2)
-                    })
-        
-        # Sort by total spent
-        return sorted(recurring, key=lambda x: x['total_spent'], reverse=True)[:10]
+        # Merchant name is the part before '@', capped at 30 chars; group case-insensitively
+        merchant = self.df['description'].fillna('').str.split('@', n=1).str[0].str.slice(0, 30)
+        merchant_key = self.df['desc_lower'].str.split('@', n=1).str[0].str.slice(0, 30)
+        
+        grouped = self.df.assign(merchant=merchant, merchant_key=merchant_key)[merchant_key != ''].groupby('merchant_key')
+        stats = grouped['withdrawal'].agg(frequency='count', total_spent='sum', avg_amount='mean')
+        stats['merchant'] = grouped['merchant'].first()
+        
+        # At least 2 occurrences, withdrawals only
+        stats = stats[(stats['frequency'] >= 2) & (stats['total_spent'] > 0)]
+        stats = stats.sort_values('total_spent', ascending=False).head(10)
+        
+        return [
+            {
+                'merchant': row.merchant,
+                'frequency': int(row.frequency),
+                'total_spent': round(row.total_spent, 2),
+                'avg_amount': round(row.avg_amount, 2)
+            }
+            for row in stats.itertuples()
+        ]
     
     def monthly_summary(self) -> Dict:
         """Calculate monthly financial summary"""
-        total_income = self.df['deposit'].sum()
-        total_expenses = self.df['withdrawal'].sum()
+        stats = self._aggregates()
+        total_income = stats['total_deposit']
+        total_expenses = stats['total_withdrawal']
         net_change = total_income - total_expenses
         
         opening = self.statement_data.get('opening_balance', 0)
@@ -123,27 +214,50 @@ class FinancialAnalyzer:
             'net_change': round(net_change, 2),
             'opening_balance': opening,
             'closing_balance': closing,
-            'avg_daily_spending': round(total_expenses / len(self.df['date'].unique()), 2),
+            'avg_daily_spending': round(total_expenses / stats['date_count'], 2),
             'savings_rate': round((total_income - total_expenses) / total_income * 100, 2) if total_income > 0 else 0
         }
     
     def unusual_transactions(self, threshold_multiplier: float = 3.0) -> List[Dict]:
         """Detect unusually large transactions"""
-        mean_withdrawal = self.df['withdrawal'].mean()
-        std_withdrawal = self.df['withdrawal'].std()
+        w = self._withdrawal
+        if len(w) < 2:
+            return []
         
-        threshold = mean_withdrawal + (threshold_multiplier * std_withdrawal)
+        stats = self._aggregates()
+        threshold = stats['mean'] + (threshold_multiplier * stats['std'])
         
-        unusual = self.df[self.df['withdrawal'] > threshold][['date', 'description', 'withdrawal']]
+        idx = np.flatnonzero(w > threshold)
+        unusual = self.df.iloc[idx][['date', 'description', 'withdrawal']]
         return unusual.to_dict('records')
     
     def spending_trend(self) -> Dict[str, float]:
         """Calculate daily spending trend"""
-        daily = self.df.groupby(self.df['date'].dt.date)['withdrawal'].sum()
-        return {str(date): round(amount, 2) for date, amount in daily.items()}
+        stats = self._aggregates()
+        return {str(day): round(amount, 2) for day, amount in zip(stats['days'], stats['day_totals'])}
+    
+    def generate_full_report(self, use_cache: bool = True) -> Dict:
+        """
+        Generate comprehensive financial report.
+        
+        Reports are cached on disk per input fingerprint and REPORT_VERSION.
+        Fresh and cached reports are the same JSON-normalized dict: dates are
+        'YYYY-MM-DD' strings and missing values (NaN/NaT) are None.
+        """
+        cache_path = config.CACHE_DIR / f"report_v{REPORT_VERSION}_{self.fingerprint}.json"
+        if use_cache and cache_path.exists():
+            try:
+                return orjson.loads(cache_path.read_bytes())
+            except Exception:
+                pass
+        
+        data = orjson.dumps(self._build_report(), option=orjson.OPT_SERIALIZE_NUMPY, default=_json_default)
+        atomic_write_bytes(cache_path, data)
+        
+        # Return the round-tripped report so a miss looks exactly like a hit
+        return orjson.loads(data)
     
-    def generate_full_report(self) -> Dict:
-        """Generate comprehensive financial report"""
+    def _build_report(self) -> Dict:
         self.categorize_transactions()
         
         return {
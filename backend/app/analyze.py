@@ -2,18 +2,20 @@
 Main script to analyze bank statements
 """
 
+import asyncio
 import sys
-import json
+import orjson
 import pandas as pd
 from app.analytics import FinancialAnalyzer
 from app.ai_insights import FinancialInsightsAgent
+from app.file_utils import write_json, write_text
 
 
 def load_transactions():
     """Load transactions from the JSON file created by main.py"""
     try:
-        with open('transactions.json', 'r') as f:
-            data = json.load(f)
+        with open('transactions.json', 'rb') as f:
+            data = orjson.loads(f.read())
         
         # Extract transactions from the bank statement data
         transactions = data.get('transactions', [])
@@ -38,7 +40,7 @@ def load_transactions():
         return pd.DataFrame()
 
 
-def main():
+async def main():
     print("\n🧮 Starting Financial Analysis...")
     print("="*70)
 
@@ -77,14 +79,11 @@ def main():
     print("   (This may take 10-20 seconds...)")
     
     agent = FinancialInsightsAgent(provider="groq")  # or "claude", "openai"
-    insights = agent.generate_insights(clean_report)
+    insights = await agent.generate_insights(clean_report)
     
     # Save results
-    with open("financial_insights.md", "w") as f:
-        f.write(insights)
-    
-    with open("financial_report.json", "w") as f:
-        json.dump(clean_report, f, indent=2)
+    write_text("financial_insights.md", insights)
+    write_json("financial_report.json", clean_report)
     
     print("\n" + "="*70)
     print(insights)
@@ -94,6 +93,15 @@ def main():
     print("   - financial_insights.md (AI insights)")
     print("   - financial_report.json (Full analytics)")
     
+    # Questions passed on the command line are answered together in one batch
+    queued_questions = [q.strip() for q in sys.argv[1:] if q.strip()]
+    if queued_questions:
+        print(f"\n💬 Answering {len(queued_questions)} queued question(s)...")
+        answers = await agent.answer_questions(queued_questions, clean_report)
+        for question, answer in zip(queued_questions, answers):
+            print(f"\n❓ {question}")
+            print(f"💡 {answer}\n")
+    
     # Interactive Q&A
     print("\n" + "="*70)
     print("💬 Ask questions about your finances (or 'quit' to exit)")
@@ -108,11 +116,11 @@ def main():
         if not question:
             continue
         
-        answer = agent.answer_question(question, clean_report)
+        answer = await agent.answer_question(question, clean_report)
         print(f"\n💡 {answer}\n")
     
     print("\n✨ Analysis complete!\n")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Answer Cache
+Reuses answers for repeated questions about the same report
+"""
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.file_utils import write_json
+
+
+def report_hash(financial_report: Dict) -> str:
+    """Stable fingerprint of a financial report"""
+    payload = json.dumps(financial_report, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    Question/answer cache keyed on (normalized question, report hash).
+    
+    Only exact repeats are served: questions that differ by a single number
+    ("above 5000" vs "above 50000") need different answers, so there is no
+    similarity matching. Normalization only folds case, whitespace and
+    trailing punctuation.
+    """
+    
+    def __init__(self, path: str = ".cache/qa_cache.json"):
+        """
+        Args:
+            path: JSON file the cache is persisted to
+        """
+        self.path = Path(path)
+        self.answers: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        
+        self._load()
+    
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return re.sub(r"\s+", " ", question.strip().lower()).rstrip("?.! ")
+    
+    def _key(self, question: str, report_key: str) -> str:
+        return hashlib.sha1(f"{report_key}:{self._normalize(question)}".encode("utf-8")).hexdigest()
+    
+    def lookup(self, question: str, report_key: str) -> Optional[str]:
+        """Return a cached answer for this question and report, if any"""
+        return self.answers.get(self._key(question, report_key))
+    
+    def store(self, question: str, report_key: str, answer: str):
+        """
+        Add an answer to the cache and persist it (atomically).
+        
+        Blocking; async callers should run it in a worker thread.
+        """
+        with self._lock:
+            self.answers[self._key(question, report_key)] = answer
+            write_json(self.path, self.answers, indent=False)
+    
+    def _load(self):
+        if not self.path.exists():
+            return
+        
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        
+        if isinstance(data, dict):
+            self.answers = data
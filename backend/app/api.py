@@ -1,20 +1,25 @@
 import shutil
 import tempfile
-import json
 import os
+import uuid
+import orjson
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Dict, Any, List
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
-from app.main import extract_document_data
+from app.main import extract_document_data_async
 from app.parse_xls import parse_bank_statement_xls
 from app.analytics import FinancialAnalyzer
 from app.ai_insights import FinancialInsightsAgent
 from app import config
+from app.file_utils import write_json, write_text
 
 # -----------------------------------------------------------------------------
 # Global State (Simplified persistence)
@@ -22,6 +27,8 @@ from app import config
 TRANSACTIONS_FILE = Path("transactions.json")
 REPORT_FILE = Path("financial_report.json")
 INSIGHTS_FILE = Path("financial_insights.md")
+# Finished insight jobs kept for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 32
 
 # -----------------------------------------------------------------------------
 # App Lifecycle
@@ -30,6 +37,11 @@ INSIGHTS_FILE = Path("financial_insights.md")
 async def lifespan(app: FastAPI):
     # Startup: Ensure necessary files/dirs exist
     print("🚀 API Starting...")
+    # One long-lived agent so its HTTP connection pool is reused across requests.
+    # Created on first use (see get_agent) so the API starts without an API key
+    app.state.agent = None
+    # Background insight jobs: job_id -> {"status": ..., "insights": ...}
+    app.state.insight_jobs = {}
     yield
     # Shutdown
     print("👋 API Shutting down...")
@@ -67,15 +79,13 @@ def save_transactions(data: Dict[str, Any]):
     # But for a real app, we'd append or DB.
     # The current CLI overwrites "transactions.json" for bank statements.
     
-    with open(TRANSACTIONS_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    write_json(TRANSACTIONS_FILE, data)
 
 def load_stored_transactions() -> Dict[str, Any]:
     if not TRANSACTIONS_FILE.exists():
         return {}
     try:
-        with open(TRANSACTIONS_FILE, "r") as f:
-            return json.load(f)
+        return orjson.loads(TRANSACTIONS_FILE.read_bytes())
     except Exception:
         return {}
 
@@ -83,11 +93,74 @@ def load_stored_report() -> Dict[str, Any]:
     if not REPORT_FILE.exists():
         return {}
     try:
-        with open(REPORT_FILE, "r") as f:
-            return json.load(f)
+        return orjson.loads(REPORT_FILE.read_bytes())
     except Exception:
         return {}
 
+def convert_timestamps(obj):
+    """Recursively convert timestamps in a report to 'YYYY-MM-DD' strings"""
+    if hasattr(obj, 'strftime'):
+        return obj.strftime('%Y-%m-%d')
+    if isinstance(obj, dict):
+        return {k: convert_timestamps(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [convert_timestamps(item) for item in obj]
+    return obj
+
+def build_report(force: bool = False) -> Dict[str, Any]:
+    """Run quantitative analysis on stored transactions and save the report"""
+    analyzer = FinancialAnalyzer(str(TRANSACTIONS_FILE))
+    report = analyzer.generate_full_report(use_cache=not force)
+    clean_report = convert_timestamps(report)
+    
+    write_json(REPORT_FILE, clean_report)
+    
+    return clean_report
+
+def save_insights(chunks: List[str]):
+    """Write streamed insight chunks to INSIGHTS_FILE"""
+    if not chunks:
+        return
+    write_text(INSIGHTS_FILE, "".join(chunks))
+
+def get_agent() -> FinancialInsightsAgent:
+    """Shared insights agent, created on the first request that needs it"""
+    if app.state.agent is None:
+        try:
+            app.state.agent = FinancialInsightsAgent(provider=config.AI_PROVIDER)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"AI provider unavailable: {e}")
+    return app.state.agent
+
+def add_insights_job() -> str:
+    """Register a pending insights job, evicting the oldest finished ones over the cap"""
+    jobs = app.state.insight_jobs
+    finished = [job_id for job_id, job in jobs.items() if job["status"] != "pending"]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS + 1)]:
+        del jobs[job_id]
+    
+    job_id = uuid.uuid4().hex
+    jobs[job_id] = {"status": "pending", "insights": None}
+    return job_id
+
+async def run_insights_job(job_id: str, report: Dict[str, Any], use_cache: bool):
+    """Generate insights for a background job and record the result"""
+    job = app.state.insight_jobs[job_id]
+    try:
+        insights = await get_agent().generate_insights(report, use_cache=use_cache)
+        await run_in_threadpool(save_insights, [insights])
+        job.update(status="done", insights=insights)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        job.update(status="error", error=str(e))
+
+def sse_event(data: str, event: str = None) -> str:
+    """Format a Server-Sent Event; multi-line payloads become multiple data lines"""
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
 # -----------------------------------------------------------------------------
 # Endpoints
 # -----------------------------------------------------------------------------
@@ -122,19 +195,19 @@ async def upload_file(file: UploadFile = File(...)):
             # Parse XLS
             # Note: parse_xls.py might behave differently for xlsx vs xls, 
             # but pandas reads both usually.
-            data = parse_bank_statement_xls(tmp_path)
+            data = await run_in_threadpool(parse_bank_statement_xls, tmp_path)
             # Save immediately
-            save_transactions(data)
+            await run_in_threadpool(save_transactions, data)
             
         elif ext == 'pdf':
             # Extract PDF
-            # extract_document_data returns (result, doc_type)
+            # extract_document_data_async returns (result, doc_type)
             # result is a Pydantic model
-            result, doc_type = extract_document_data(tmp_path)
+            result, doc_type = await extract_document_data_async(tmp_path)
             data = result.model_dump()
             
             if doc_type == "bank_statement":
-                save_transactions(data)
+                await run_in_threadpool(save_transactions, data)
             
         return {
             "status": "success",
@@ -154,7 +227,7 @@ async def upload_file(file: UploadFile = File(...)):
 @app.get("/api/transactions")
 async def get_transactions():
     """Get stored transactions"""
-    data = load_stored_transactions()
+    data = await run_in_threadpool(load_stored_transactions)
     transactions = data.get("transactions", [])
     account_info = {k: v for k, v in data.items() if k != "transactions"}
     return {
@@ -163,54 +236,103 @@ async def get_transactions():
     }
 
 @app.get("/api/analysis")
-async def get_analysis():
-    """Trigger analysis and return report + insights"""
+async def get_analysis(background_tasks: BackgroundTasks, force: bool = False, wait: bool = True):
+    """
+    Trigger analysis and return report + insights.
+    
+    Report and insights are served from cache when transactions.json is
+    unchanged; pass ?force=true to regenerate both.
+    
+    With ?wait=false the report is returned immediately along with an
+    'insights_job_id'; poll /api/analysis/insights/{job_id} for the insights.
+    """
     if not TRANSACTIONS_FILE.exists():
         raise HTTPException(status_code=404, detail="No transactions found. Upload a statement first.")
     
     try:
         # 1. Run Quantitative Analysis
-        analyzer = FinancialAnalyzer(str(TRANSACTIONS_FILE))
-        report = analyzer.generate_full_report()
-        
-        # Serialize report (handle timestamps)
-        def convert_timestamps(obj):
-            if hasattr(obj, 'strftime'):
-                return obj.strftime('%Y-%m-%d')
-            if isinstance(obj, dict):
-                return {k: convert_timestamps(v) for k, v in obj.items()}
-            if isinstance(obj, list):
-                return [convert_timestamps(item) for item in obj]
-            return obj
-            
-        clean_report = convert_timestamps(report)
-        
-        # Save Report
-        with open(REPORT_FILE, "w") as f:
-            json.dump(clean_report, f, indent=2)
+        clean_report = await run_in_threadpool(build_report, force)
             
-        # 2. Run AI Analysis
-        # Note: This might be slow, so maybe we want to cache or run in background?
-        # For now, run synchronously or use cached if recent?
-        # Let's run it every time for simplicity, or check if insights exist?
-        # The user might want fresh insights.
+        # 2. Run AI Analysis (cached per report unless forced)
+        if not wait:
+            job_id = add_insights_job()
+            background_tasks.add_task(run_insights_job, job_id, clean_report, not force)
+            return {
+                "report": clean_report,
+                "insights_job_id": job_id
+            }
         
-        agent = FinancialInsightsAgent(provider=config.AI_PROVIDER)
-        insights = agent.generate_insights(clean_report)
+        agent = get_agent()
+        insights = await agent.generate_insights(clean_report, use_cache=not force)
         
-        with open(INSIGHTS_FILE, "w") as f:
-            f.write(insights)
+        await run_in_threadpool(save_insights, [insights])
             
         return {
             "report": clean_report,
             "insights": insights
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.get("/api/analysis/insights/{job_id}")
+async def get_insights_job(job_id: str):
+    """
+    Poll a background insights job started with /api/analysis?wait=false.
+    
+    A finished (done or error) job is returned once and then forgotten.
+    """
+    job = app.state.insight_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown insights job.")
+    if job["status"] != "pending":
+        del app.state.insight_jobs[job_id]
+    return job
+
+@app.get("/api/analysis/stream")
+async def stream_analysis(force: bool = False):
+    """
+    Same as /api/analysis, streamed as Server-Sent Events.
+    
+    Emits one 'report' event with the JSON report, then insight text chunks as
+    they are generated, then a 'done' event.
+    """
+    if not TRANSACTIONS_FILE.exists():
+        raise HTTPException(status_code=404, detail="No transactions found. Upload a statement first.")
+    
+    try:
+        clean_report = await run_in_threadpool(build_report, force)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    
+    agent = get_agent()
+    chunks: List[str] = []
+    
+    async def event_stream():
+        yield sse_event(orjson.dumps(clean_report, option=orjson.OPT_SERIALIZE_NUMPY).decode(), event="report")
+        try:
+            async for chunk in agent.stream_insights(clean_report, use_cache=not force):
+                chunks.append(chunk)
+                yield sse_event(chunk)
+        except Exception as e:
+            chunks.clear()  # don't persist a partial answer
+            yield sse_event(str(e), event="error")
+            return
+        yield sse_event("", event="done")
+    
+    # Persist the full text once the stream has closed
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        background=BackgroundTask(save_insights, chunks)
+    )
+
 @app.post("/api/chat")
 async def chat_with_agent(request: ChatRequest):
     """Chat with the financial agent about the data"""
@@ -220,10 +342,32 @@ async def chat_with_agent(request: ChatRequest):
          raise HTTPException(status_code=404, detail="Analysis report not found. Please Run Analysis first.")
     
     try:
-        report = load_stored_report()
-        agent = FinancialInsightsAgent(provider=config.AI_PROVIDER)
-        answer = agent.answer_question(request.message, report)
+        report = await run_in_threadpool(load_stored_report)
+        agent = get_agent()
+        answer = await agent.answer_question(request.message, report)
         return ChatResponse(response=answer)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/chat/stream")
+async def stream_chat(request: ChatRequest):
+    """Chat with the financial agent, streaming the answer as Server-Sent Events"""
+    if not REPORT_FILE.exists():
+        raise HTTPException(status_code=404, detail="Analysis report not found. Please Run Analysis first.")
+    
+    report = await run_in_threadpool(load_stored_report)
+    agent = get_agent()
+    
+    async def event_stream():
+        try:
+            async for chunk in agent.stream_answer(request.message, report):
+                yield sse_event(chunk)
+        except Exception as e:
+            yield sse_event(str(e), event="error")
+            return
+        yield sse_event("", event="done")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,6 +7,13 @@ load_dotenv()
 # Provider selection
 AI_PROVIDER = os.getenv("AI_PROVIDER", "claude").lower()
 
+# Directory for derived artifacts (report / insights / Q&A caches)
+CACHE_DIR = Path(os.getenv("CACHE_DIR", ".cache"))
+
+# Page images sent to vision models: target pixels on the long edge, capped DPI
+TARGET_LONG_EDGE = int(os.getenv("TARGET_LONG_EDGE", "1600"))
+MAX_RENDER_DPI = 200
+
 # API Keys
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
@@ -25,3 +33,11 @@ MODELS = {
     # "openrouter": "qwen/qwen-2-vl-72b-instruct:free",
     "openrouter": "mistralai/mistral-large:free"
 }
+
+# Smaller/cheaper models for chat Q&A over an already-computed report
+QA_MODELS = {
+    "gemini": "gemini-2.0-flash-lite",
+    "claude": "claude-haiku-4-5-20251001",
+    "openai": "gpt-4o-mini",
+    "groq": "llama-3.1-8b-instant",
+}
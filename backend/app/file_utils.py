@@ -0,0 +1,64 @@
+import os
+import tempfile
+from pathlib import Path
+
+import orjson
+
+
+def _current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Mode a plain open() would create files with. Read once at import: querying
+# the umask briefly changes it for the whole process
+FILE_MODE = 0o666 & ~_current_umask()
+
+
+def atomic_write_bytes(path, data: bytes):
+    """
+    Write bytes to a file atomically.
+
+    Data goes to a unique temp file in the same directory, which then
+    replaces the target via os.replace, so readers never see a torn file.
+
+    Args:
+        path: Destination file path
+        data: File contents
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates 0600 files; give the target the usual permissions
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json(path, obj, indent: bool = True, default=None):
+    """
+    Serialize obj with orjson and write it atomically.
+
+    Args:
+        path: Destination file path
+        obj: JSON-serializable data (numpy scalars allowed)
+        indent: Pretty-print with 2-space indentation
+        default: Fallback serializer for unsupported types
+    """
+    option = orjson.OPT_SERIALIZE_NUMPY
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    atomic_write_bytes(path, orjson.dumps(obj, option=option, default=default))
+
+
+def write_text(path, text: str):
+    """Write UTF-8 text atomically"""
+    atomic_write_bytes(path, text.encode("utf-8"))
@@ -1,56 +1,65 @@
+import asyncio
 import os
 import sys
+from collections import defaultdict
 from app.models import InvoiceData, BankStatementData, InvoiceExtraction
 from app.providers import get_provider
 import fitz  # PyMuPDF
+import numpy as np
 from app import config
-from app.pdf_utils import unlock_pdf
-import tempfile
-from pathlib import Path
+from app.pdf_utils import open_pdf, unlock_pdf
+from app.file_utils import write_text
+import re
 
+# First-page phrases that identify each document type, one alternation each
+BANK_INDICATORS_RE = re.compile('|'.join(map(re.escape, [
+    'statement of account', 'bank statement', 'account statement',
+    'opening balance', 'closing balance', 'transaction details'
+])))
+INVOICE_INDICATORS_RE = re.compile('|'.join(map(re.escape, [
+    'invoice', 'bill', 'tax invoice', 'invoice number'
+])))
 
-def detect_document_type(pdf_path: str) -> str:
+
+def detect_document_type(pdf) -> str:
     """
     Detect if document is a bank statement or invoice by checking first page text.
+    Accepts a PDF path or an already-open fitz.Document (which is left open).
     """
-    import fitz
-    doc = fitz.open(pdf_path)
-    first_page = doc[0].get_text().lower()
-    doc.close()
+    # One extraction: text blocks with positions, so the header is known too
+    with open_pdf(pdf) as doc:
+        page = doc[0]
+        header_bottom = page.rect.y0 + page.rect.height * 0.25
+        blocks = [(b[1], b[4].lower()) for b in page.get_text("blocks") if b[6] == 0]
     
-    # Check for bank statement indicators
-    bank_indicators = ['statement of account', 'bank statement', 'account statement', 
-                      'opening balance', 'closing balance', 'transaction details']
+    first_page = "\n".join(text for _, text in blocks)
+    is_bank = BANK_INDICATORS_RE.search(first_page) is not None
+    is_invoice = INVOICE_INDICATORS_RE.search(first_page) is not None
     
-    if any(indicator in first_page for indicator in bank_indicators):
+    if is_bank and is_invoice:
+        # Both kinds of phrase appear: let the title area (top quarter) decide
+        header = "\n".join(text for y0, text in blocks if y0 < header_bottom)
+        if INVOICE_INDICATORS_RE.search(header) and not BANK_INDICATORS_RE.search(header):
+            return "invoice"
         return "bank_statement"
     
-    # Check for invoice indicators
-    invoice_indicators = ['invoice', 'bill', 'tax invoice', 'invoice number']
+    if is_bank:
+        return "bank_statement"
     
-    if any(indicator in first_page for indicator in invoice_indicators):
+    if is_invoice:
         return "invoice"
     
     # Default to bank statement for financial documents
     return "bank_statement"
 
 
-def extract_document_data(pdf_path: str, doc_type: str = None, include_layout: bool = False):
-    """
-    Extract data from financial documents (bank statements or invoices).
-    Auto-detects document type if not specified.
+def build_extraction_request(doc_type: str, include_layout: bool = False):
     """
+    Pick the response schema and extraction prompt for a document type.
     
-    # Auto-detect document type if not provided
-    if doc_type is None:
-        doc_type = detect_document_type(pdf_path)
-        print(f"📋 Detected document type: {doc_type.upper()}")
-    
-    # Get AI provider
-    provider = get_provider()
-    print(f"📄 Using {provider.get_provider_name()} for extraction...")
-    
-    # Choose schema and prompt based on document type
+    Returns:
+        (schema, prompt) tuple
+    """
     if doc_type == "bank_statement":
         from app.models import BankStatementData
         schema = BankStatementData
@@ -122,6 +131,29 @@ Layout rules:
 - If field not found, set both bounding_box and page to null
 """
     
+    return schema, prompt
+
+
+def extract_document_data(pdf_path, doc_type: str = None, include_layout: bool = False, doc: fitz.Document = None):
+    """
+    Extract data from financial documents (bank statements or invoices).
+    pdf_path may also be the PDF's raw bytes (e.g. a decrypted in-memory copy).
+    Auto-detects document type if not specified; pass the already-open
+    document as doc to detect from it instead of re-opening pdf_path.
+    """
+    
+    # Auto-detect document type if not provided
+    if doc_type is None:
+        doc_type = detect_document_type(doc if doc is not None else pdf_path)
+        print(f"📋 Detected document type: {doc_type.upper()}")
+    
+    # Get AI provider
+    provider = get_provider()
+    print(f"📄 Using {provider.get_provider_name()} for extraction...")
+    
+    # Choose schema and prompt based on document type
+    schema, prompt = build_extraction_request(doc_type, include_layout)
+    
     # Extract using provider
     print(f"🤖 Extracting {doc_type.replace('_', ' ')}...")
     result = provider.extract_from_pdf(pdf_path, prompt, schema)
@@ -129,16 +161,58 @@ Layout rules:
     
     return result, doc_type
 
-def annotate_pdf(pdf_path: str, extraction: InvoiceExtraction, output_path: str):
-    """Draw bounding boxes on PDF"""
+
+async def extract_document_data_async(pdf_path: str, doc_type: str = None, include_layout: bool = False):
+    """
+    Async variant of extract_document_data.
+    The provider call is awaited instead of blocking the event loop.
+    """
+    if doc_type is None:
+        doc_type = await asyncio.to_thread(detect_document_type, pdf_path)
+        print(f"📋 Detected document type: {doc_type.upper()}")
     
-    doc = fitz.open(pdf_path)
+    provider = get_provider()
+    print(f"📄 Using {provider.get_provider_name()} for extraction...")
+    
+    schema, prompt = build_extraction_request(doc_type, include_layout)
+    
+    print(f"🤖 Extracting {doc_type.replace('_', ' ')}...")
+    result = await provider.extract_from_pdf_async(pdf_path, prompt, schema)
+    print("✅ Extraction complete")
+    
+    return result, doc_type
+
+
+async def extract_documents_data(pdf_paths: list, max_concurrency: int = 4) -> list:
+    """
+    Extract several documents concurrently, at most max_concurrency at a time.
+    Returns (result, doc_type) tuples in the same order as pdf_paths.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def extract(pdf_path: str):
+        async with semaphore:
+            return await extract_document_data_async(pdf_path)
+    
+    return await asyncio.gather(*(extract(path) for path in pdf_paths))
+
+
+def annotate_pdf(pdf_path, extraction: InvoiceExtraction, output_path: str):
+    """
+    Draw bounding boxes on PDF.
+    Accepts a PDF path or an already-open fitz.Document (which is left open).
+    """
     
     if not extraction.layout:
         print("⚠️  No layout information available for annotation")
-        doc.close()
         return
     
+    with open_pdf(pdf_path) as doc:
+        _draw_layout_boxes(doc, extraction, output_path)
+
+
+def _draw_layout_boxes(doc: fitz.Document, extraction: InvoiceExtraction, output_path: str):
+    """Draw layout boxes onto an open document and save it to output_path"""
     field_colors = {
         'invoice_number': (1, 0, 0),
         'date': (0, 0.8, 0),
@@ -149,78 +223,95 @@ def annotate_pdf(pdf_path: str, extraction: InvoiceExtraction, output_path: str)
         'account_no': (0.9, 0.9, 0),
     }
     
-    annotations_drawn = 0
+    # Flatten the layout once instead of resolving each field by attribute
+    layout = extraction.layout.model_dump(exclude_none=True)
+    
+    # Collect boxes per page, then draw each page's boxes through one Shape
+    boxes_by_page = defaultdict(list)
     
     for field_name, color in field_colors.items():
-        layout_field = getattr(extraction.layout, field_name)
+        layout_field = layout.get(field_name)
         
-        if not layout_field or not layout_field.bounding_box or not layout_field.page:
+        if not layout_field or not layout_field.get('bounding_box') or not layout_field.get('page'):
             continue
         
-        box = layout_field.bounding_box
-        if box == [0, 0, 0, 0]:
+        box = layout_field['bounding_box']
+        if len(box) != 4 or box == [0, 0, 0, 0]:
             continue
         
-        page_num = layout_field.page
+        page_num = layout_field['page']
         if page_num < 1 or page_num > len(doc):
             continue
-            
+        
+        boxes_by_page[page_num].append((field_name, color, box))
+    
+    annotations_drawn = 0
+    
+    for page_num, fields in boxes_by_page.items():
         page = doc[page_num - 1]
-        y0, x0, y1, x1 = box
         page_rect = page.rect
+        shape = page.new_shape()
         
-        rect = fitz.Rect(
-            (x0 / 1000) * page_rect.width,
-            (y0 / 1000) * page_rect.height,
-            (x1 / 1000) * page_rect.width,
-            (y1 / 1000) * page_rect.height
-        )
+        # [y0, x0, y1, x1] on a 0-1000 scale -> absolute (x0, y0, x1, y1), all boxes at once
+        boxes = np.array([box for _, _, box in fields], dtype=np.float64)[:, [1, 0, 3, 2]]
+        rects = boxes / 1000 * np.array([page_rect.width, page_rect.height] * 2)
         
-        page.draw_rect(rect, color=color, width=2)
-        label = field_name.replace('_', ' ').title()
-        page.insert_text((rect.x0, rect.y0 - 3), label, fontsize=8, color=color)
-        annotations_drawn += 1
+        for (field_name, color, _), coords in zip(fields, rects.tolist()):
+            rect = fitz.Rect(coords)
+            
+            shape.draw_rect(rect)
+            shape.finish(color=color, width=2)
+            label = field_name.replace('_', ' ').title()
+            shape.insert_text((rect.x0, rect.y0 - 3), label, fontsize=8, color=color)
+            annotations_drawn += 1
+        
+        # One content-stream update per page instead of two per field
+        shape.commit()
     
     if annotations_drawn > 0:
-        doc.save(output_path)
+        # Compact xref, deflate streams and drop orphaned objects
+        doc.save(output_path, garbage=4, deflate=True, clean=True)
         print(f"✅ Annotated PDF saved to '{output_path}' ({annotations_drawn} fields marked)")
     else:
         print("⚠️  No valid bounding boxes found")
-    
-    doc.close()
 
 
 def print_bank_statement_data(data: BankStatementData):
     """Pretty print bank statement data"""
-    print("\n" + "="*70)
-    print("📊 EXTRACTED BANK STATEMENT DATA")
-    print("="*70)
-    print(f"Account Holder    : {data.account_holder or 'N/A'}")
-    print(f"Account Number    : {data.account_number or 'N/A'}")
-    print(f"Bank              : {data.bank_name or 'N/A'}")
-    print(f"Branch            : {data.branch or 'N/A'}")
-    print(f"Statement Period  : {data.statement_period_from or 'N/A'} to {data.statement_period_to or 'N/A'}")
-    print(f"Currency          : {data.currency or 'INR'}")
-    print(f"Opening Balance   : {data.opening_balance or 'N/A'}")
-    print(f"Closing Balance   : {data.closing_balance or 'N/A'}")
-    print(f"Total Transactions: {len(data.transactions)}")
-    print("="*70)
+    # Build the whole report, then write it to stdout once
+    lines = [
+        "\n" + "="*70,
+        "📊 EXTRACTED BANK STATEMENT DATA",
+        "="*70,
+        f"Account Holder    : {data.account_holder or 'N/A'}",
+        f"Account Number    : {data.account_number or 'N/A'}",
+        f"Bank              : {data.bank_name or 'N/A'}",
+        f"Branch            : {data.branch or 'N/A'}",
+        f"Statement Period  : {data.statement_period_from or 'N/A'} to {data.statement_period_to or 'N/A'}",
+        f"Currency          : {data.currency or 'INR'}",
+        f"Opening Balance   : {data.opening_balance or 'N/A'}",
+        f"Closing Balance   : {data.closing_balance or 'N/A'}",
+        f"Total Transactions: {len(data.transactions)}",
+        "="*70,
+    ]
     
     if data.transactions:
-        print("\n📝 TRANSACTIONS (showing first 10):")
-        print("-" * 70)
+        lines.append("\n📝 TRANSACTIONS (showing first 10):")
+        lines.append("-" * 70)
         for i, txn in enumerate(data.transactions[:10], 1):
-            print(f"\n{i}. Date: {txn.date}")
-            print(f"   Description: {txn.description}")
+            lines.append(f"\n{i}. Date: {txn.date}")
+            lines.append(f"   Description: {txn.description}")
             if txn.withdrawal:
-                print(f"   Withdrawal: {txn.withdrawal}")
+                lines.append(f"   Withdrawal: {txn.withdrawal}")
             if txn.deposit:
-                print(f"   Deposit: {txn.deposit}")
-            print(f"   Balance: {txn.balance}")
+                lines.append(f"   Deposit: {txn.deposit}")
+            lines.append(f"   Balance: {txn.balance}")
         
         if len(data.transactions) > 10:
-            print(f"\n... and {len(data.transactions) - 10} more transactions")
-    print("="*70 + "\n")
+            lines.append(f"\n... and {len(data.transactions) - 10} more transactions")
+    lines.append("="*70 + "\n")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 def print_invoice_data(data: InvoiceData):
@@ -252,27 +343,23 @@ if __name__ == "__main__":
         exit(1)
     
     # Handle password-protected PDFs
-    temp_pdf_created = None
+    pdf_source = PDF_FILE
     try:
         print("🔍 Checking PDF status...")
         
         doc = fitz.open(PDF_FILE)
         
         if doc.is_encrypted:
-            doc.close()
             print("🔒 PDF is password-protected")
             
-            unlocked_doc = unlock_pdf(PDF_FILE)
-            
-            temp_pdf = Path(tempfile.gettempdir()) / f"unlocked_{Path(PDF_FILE).name}"
-            unlocked_doc.save(str(temp_pdf), encryption=fitz.PDF_ENCRYPT_NONE)
-            unlocked_doc.close()
+            # Authenticate the open document in place; it stays open for type
+            # detection below
+            doc = unlock_pdf(doc)
             
-            print(f"📄 Temporary unlocked PDF: {temp_pdf}")
-            PDF_FILE = str(temp_pdf)
-            temp_pdf_created = str(temp_pdf)
+            # Providers get the decrypted PDF as bytes, no temp file needed
+            pdf_source = doc.tobytes(encryption=fitz.PDF_ENCRYPT_NONE, garbage=3, deflate=True)
+            print(f"📄 Unlocked PDF in memory ({len(pdf_source) / 1e6:.1f} MB)")
         else:
-            doc.close()
             print("✅ PDF is not password-protected")
         
     except Exception as e:
@@ -283,24 +370,20 @@ if __name__ == "__main__":
     print("\n🔍 Extracting Document Data")
     print("-" * 50)
     
-    data, doc_type = extract_document_data(PDF_FILE, doc_type=None, include_layout=False)
+    data, doc_type = extract_document_data(pdf_source, doc_type=None, include_layout=False, doc=doc)
+    doc.close()
     
     # Print results based on document type
     if doc_type == "bank_statement":
         print_bank_statement_data(data)
         
         # Save transactions to JSON for further analysis
-        import json
-        with open("transactions.json", "w") as f:
-            json.dump(data.model_dump(), f, indent=2)
+        # Serialized straight from the model by pydantic-core, without building
+        # an intermediate dict of every transaction first
+        write_text("transactions.json", data.model_dump_json(indent=2))
         print("💾 Full statement data saved to transactions.json")
         
     else:  # invoice
         print_invoice_data(data)
     
-    # Clean up temp file
-    if temp_pdf_created and os.path.exists(temp_pdf_created):
-        os.remove(temp_pdf_created)
-        print("🗑️  Temporary unlocked PDF cleaned up")
-    
     print("\n✨ All done!\n")
\ No newline at end of file
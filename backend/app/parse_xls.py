@@ -1,7 +1,64 @@
+import numpy as np
 import pandas as pd
 import json
 import re
 
+# Rust-based calamine reader (pandas >= 2.2) when python-calamine is installed;
+# otherwise pandas picks its default engine (xlrd for .xls, openpyxl for .xlsx)
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = None
+
+# Non-transaction rows inside the table: summary/footer lines and page separators
+SUMMARY_ROW_RE = re.compile(r'Opening Balance|STATEMENT SUMMARY|Generated|Continue|Page No', re.IGNORECASE)
+SEPARATOR_RE = re.compile(r'-+$')
+
+# Statement dates as written in the sheet (dd/mm/yy)
+DATE_TEXT_RE = re.compile(r'\d{2}/\d{2}/\d{2}')
+
+# Output fields of each transaction, in order
+TRANSACTION_COLUMNS = ['date', 'description', 'cheque_ref_no', 'value_date', 'withdrawal', 'deposit', 'balance']
+
+# Account-info patterns for the header block
+NAME_PREFIX_RE = re.compile(r'MRS?\.|MS\.')
+ACCOUNT_NO_RE = re.compile(r'(\d{14})')
+BRANCH_RE = re.compile(r'Account Branch\s*:\s*([A-Z\s]+?)(?:Address|$)')
+PERIOD_RE = re.compile(r'(\d{2}/\d{2}/\d{4})\s+To[:\s]+(\d{2}/\d{2}/\d{4})')
+
+
+def opening_closing_balance(withdrawal: np.ndarray, deposit: np.ndarray, balance: np.ndarray):
+    """
+    Opening and closing balance from per-transaction amount arrays (NaN = empty).
+    
+    Opening balance is backed out of the first transaction with a balance;
+    closing balance is the last one. Returns (None, None) if no row has a balance.
+    """
+    rows = np.flatnonzero(~np.isnan(balance))
+    if len(rows) == 0:
+        return None, None
+    
+    first, last = rows[0], rows[-1]
+    if not np.isnan(withdrawal[first]):
+        opening = balance[first] + withdrawal[first]
+    elif not np.isnan(deposit[first]):
+        opening = balance[first] - deposit[first]
+    else:
+        opening = balance[first]
+    
+    return opening, balance[last]
+
+
+def count_balance_mismatches(withdrawal: np.ndarray, deposit: np.ndarray, balance: np.ndarray) -> int:
+    """
+    Count rows where balance[i] != balance[i-1] - withdrawal[i] + deposit[i]
+    (to the paisa). Rows without a balance on either side are skipped.
+    """
+    expected = balance[:-1] - np.nan_to_num(withdrawal[1:]) + np.nan_to_num(deposit[1:])
+    checked = ~np.isnan(balance[1:]) & ~np.isnan(balance[:-1])
+    return int(np.count_nonzero(checked & ~np.isclose(balance[1:], expected, rtol=0, atol=0.005)))
+
 
 def parse_bank_statement_xls(xls_path: str) -> dict:
     """
@@ -16,28 +73,32 @@ def parse_bank_statement_xls(xls_path: str) -> dict:
     
     print(f"📂 Reading {xls_path}...")
     
-    # Read the Excel file
-    df_raw = pd.read_excel(xls_path)
+    # Read the Excel file once; the header block and transaction table are
+    # both sliced from this frame. Index = sheet row number.
+    sheet = pd.read_excel(xls_path, header=None, engine=EXCEL_ENGINE)
+    
+    # The first sheet row is the title line, not part of the header block
+    df_raw = sheet.iloc[1:]
     
     print(f"📊 File has {len(df_raw)} rows and {len(df_raw.columns)} columns")
     
     # Find where the transaction data starts
-    start_row = None
-    for idx, row in df_raw.iterrows():
-        row_str = ' '.join(str(x) for x in row.values if pd.notna(x))
+    header_row = None
+    for idx, row in zip(df_raw.index, df_raw.itertuples(index=False, name=None)):
+        row_str = ' '.join(str(x) for x in row if pd.notna(x))
         if 'Date' in row_str and 'Narration' in row_str:
-            start_row = idx + 1
+            header_row = idx
             print(f"✅ Found transaction header at row {idx}")
             break
     
-    if start_row is None:
+    if header_row is None:
         raise ValueError("Could not find transaction data in XLS")
     
-    # Read again, skipping header rows
-    df = pd.read_excel(xls_path, skiprows=start_row)
+    # Transaction table: rows below the header, typed per column
+    df = sheet.iloc[header_row + 1:].reset_index(drop=True).infer_objects()
     
     # Clean column names
-    df.columns = df.columns.str.strip()
+    df.columns = [str(c).strip() for c in sheet.iloc[header_row]]
     
     # Column mapping
     column_mapping = {
@@ -54,20 +115,23 @@ def parse_bank_statement_xls(xls_path: str) -> dict:
     
     print(f"🔄 Mapped columns: {df.columns.tolist()}\n")
     
-    # Clean up the data - remove summary rows
-    df = df[df['date'].notna()].copy()
-    df = df[~df['date'].astype(str).str.contains(
-        'Opening Balance|STATEMENT SUMMARY|Generated|Continue|Page No', 
-        na=False, 
-        case=False
-    )]
+    # Keep only the transaction columns so the cleanup below touches nothing else
+    df = df[[col for col in TRANSACTION_COLUMNS if col in df.columns]]
     
-    # Remove rows with dashes (page separators)
-    df = df[~df['date'].astype(str).str.match(r'^-+$')]
+    # Clean up the data - remove summary rows
+    # and rows with dashes (page separators), in one pass over the date column
+    df = df[df['date'].notna()]
+    keep = [
+        not (SUMMARY_ROW_RE.search(value) or SEPARATOR_RE.match(value))
+        for value in df['date'].astype(str)
+    ]
+    df = df[keep].copy()
     
     print(f"✅ Found {len(df)} transactions after cleanup\n")
     
-    # Convert date to datetime
+    # Convert date to datetime (validates the dates); keep the source text
+    # so valid dates can be reformatted without strftime
+    date_text = df['date'].astype(str)
     df['date'] = pd.to_datetime(df['date'], format='%d/%m/%y', errors='coerce')
     
     # Drop rows where date conversion failed
@@ -76,16 +140,23 @@ def parse_bank_statement_xls(xls_path: str) -> dict:
     # Convert amounts to float - HDFC uses commas in numbers
     for col in ['withdrawal', 'deposit', 'balance']:
         if col in df.columns:
-            # Replace commas, handle empty strings
-            df[col] = df[col].astype(str).str.replace(',', '').str.strip()
-            df[col] = df[col].replace(['', 'nan', 'NaN'], None)
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+            values = df[col]
+            if not pd.api.types.is_numeric_dtype(values):
+                # Strip commas in one C-level pass; blanks/'nan' coerce to NaN
+                cleaned = np.char.replace(values.to_numpy(dtype=str), ',', '')
+                values = pd.to_numeric(cleaned, errors='coerce')
+            df[col] = values.astype(np.float64)
     
-    # Format dates as strings for JSON
-    df['date'] = df['date'].dt.strftime('%d/%m/%Y')
+    # Format dates as strings for JSON. Zero-padded dd/mm/yy text only needs
+    # its 4-digit year spliced in; anything else goes through strftime
+    date_text = date_text.loc[df.index]
+    if date_text.str.fullmatch(DATE_TEXT_RE).all():
+        df['date'] = date_text.str.slice(0, 6) + df['date'].dt.year.astype(str)
+    else:
+        df['date'] = df['date'].dt.strftime('%d/%m/%Y')
     
-    # Extract account information from header
-    raw_df = pd.read_excel(xls_path, nrows=30)
+    # Extract account information from the rows above the transaction header
+    raw_df = df_raw.loc[:header_row - 1].reset_index(drop=True)
     
     account_info = {
         "account_holder": None,
@@ -98,13 +169,14 @@ def parse_bank_statement_xls(xls_path: str) -> dict:
     }
     
     # Parse account info from header
-    for idx, row in raw_df.iterrows():
+    header_fields = ('account_holder', 'account_number', 'branch', 'statement_period_from')
+    for idx, row in enumerate(raw_df.itertuples(index=False, name=None)):
         # Get all non-null values in the row
-        values = [str(x) for x in row.values if pd.notna(x)]
+        values = [str(x) for x in row if pd.notna(x)]
         row_str = ' '.join(values)
         
         # Extract account holder - usually starts with MR./MRS./MS.
-        if idx < 10 and any(prefix in row_str for prefix in ['MR.', 'MRS.', 'MS.']):
+        if idx < 10 and NAME_PREFIX_RE.search(row_str):
             # Clean up the name
             name_parts = []
             for val in values:
@@ -116,62 +188,43 @@ def parse_bank_statement_xls(xls_path: str) -> dict:
         
         # Extract account number
         if 'Account No' in row_str:
-            match = re.search(r'(\d{14})', row_str)
+            match = ACCOUNT_NO_RE.search(row_str)
             if match:
                 account_info['account_number'] = match.group(1)
         
         # Extract branch
         if 'Account Branch' in row_str:
-            match = re.search(r'Account Branch\s*:\s*([A-Z\s]+?)(?:Address|$)', row_str)
+            match = BRANCH_RE.search(row_str)
             if match:
                 account_info['branch'] = match.group(1).strip()
         
         # Extract statement period
         if 'Statement From' in row_str:
-            match = re.search(r'(\d{2}/\d{2}/\d{4})\s+To[:\s]+(\d{2}/\d{2}/\d{4})', row_str)
+            match = PERIOD_RE.search(row_str)
             if match:
                 account_info['statement_period_from'] = match.group(1)
                 account_info['statement_period_to'] = match.group(2)
+        
+        # Stop once every header field has been found
+        if all(account_info[key] for key in header_fields):
+            break
     
-    # Calculate opening and closing balances
-    opening_balance = None
-    closing_balance = None
+    # Calculate opening and closing balances from the amount columns
+    amounts = df.reindex(columns=['withdrawal', 'deposit', 'balance']).to_numpy(dtype=np.float64)
+    withdrawal, deposit, balance = amounts.T
+    opening_balance, closing_balance = opening_closing_balance(withdrawal, deposit, balance)
     
-    if not df.empty:
-        # Get first and last transactions with valid balance
-        df_with_balance = df[df['balance'].notna()]
-        
-        if not df_with_balance.empty:
-            first_txn = df_with_balance.iloc[0]
-            
-            # Calculate opening balance
-            if pd.notna(first_txn.get('withdrawal')):
-                opening_balance = first_txn['balance'] + first_txn['withdrawal']
-            elif pd.notna(first_txn.get('deposit')):
-                opening_balance = first_txn['balance'] - first_txn['deposit']
-            else:
-                opening_balance = first_txn['balance']
-            
-            # Get closing balance
-            closing_balance = df_with_balance.iloc[-1]['balance']
+    mismatches = count_balance_mismatches(withdrawal, deposit, balance)
+    if mismatches:
+        print(f"⚠️  {mismatches} transactions don't reconcile with the running balance")
     
     account_info['opening_balance'] = opening_balance
     account_info['closing_balance'] = closing_balance
     
     # Convert DataFrame to list of transaction dicts
-    # Replace NaN with None for clean JSON
-    transactions = []
-    for _, row in df.iterrows():
-        txn = {
-            'date': row['date'],
-            'description': row.get('description'),
-            'cheque_ref_no': row.get('cheque_ref_no'),
-            'value_date': row.get('value_date'),
-            'withdrawal': None if pd.isna(row.get('withdrawal')) else float(row.get('withdrawal')),
-            'deposit': None if pd.isna(row.get('deposit')) else float(row.get('deposit')),
-            'balance': None if pd.isna(row.get('balance')) else float(row.get('balance'))
-        }
-        transactions.append(txn)
+    # Replace NaN with None for clean JSON (whole frame at once)
+    txn_df = df.reindex(columns=TRANSACTION_COLUMNS)
+    transactions = txn_df.astype(object).where(txn_df.notna(), None).to_dict('records')
     
     # Build final structure
     statement_data = {
@@ -1,14 +1,41 @@
 import fitz  # PyMuPDF
 import getpass
+from contextlib import contextmanager
 from pathlib import Path
 
 
-def unlock_pdf(pdf_path: str, password: str = None) -> fitz.Document:
+@contextmanager
+def open_pdf(pdf):
+    """
+    Use an already-open document, or open one from a path or raw bytes.
+    
+    Args:
+        pdf: Path to a PDF file, PDF bytes, or an open fitz.Document
+        
+    Yields:
+        fitz.Document (closed on exit only if it was opened here)
+    """
+    if isinstance(pdf, fitz.Document):
+        yield pdf
+        return
+    
+    if isinstance(pdf, (bytes, bytearray)):
+        doc = fitz.open(stream=pdf, filetype="pdf")
+    else:
+        doc = fitz.open(pdf)
+    try:
+        yield doc
+    finally:
+        doc.close()
+
+
+def unlock_pdf(pdf_path, password: str = None) -> fitz.Document:
     """
     Open and unlock a PDF file, prompting for password if needed.
     
     Args:
-        pdf_path: Path to the PDF file
+        pdf_path: Path to the PDF file, or an already-open fitz.Document
+            (authenticated in place, without re-opening the file)
         password: Optional password (if None, will prompt if needed)
         
     Returns:
@@ -18,10 +45,13 @@ def unlock_pdf(pdf_path: str, password: str = None) -> fitz.Document:
         ValueError: If password is incorrect or file cannot be opened
     """
     
-    if not Path(pdf_path).exists():
-        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-    
-    doc = fitz.open(pdf_path)
+    if isinstance(pdf_path, fitz.Document):
+        doc = pdf_path
+    else:
+        if not Path(pdf_path).exists():
+            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        
+        doc = fitz.open(pdf_path)
     
     # Check if PDF is encrypted
     if not doc.is_encrypted:
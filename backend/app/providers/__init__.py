@@ -1,3 +1,4 @@
+from functools import lru_cache
 from .openrouter import OpenRouterProvider
 from .base import AIProvider
 from .gemini import GeminiProvider
@@ -7,8 +8,14 @@ from .groq import GroqProvider
 from app import config
 
 
+@lru_cache(maxsize=1)
 def get_provider() -> AIProvider:
-    """Factory function to get the configured AI provider"""
+    """
+    Factory function to get the configured AI provider.
+    
+    The instance is created once and shared, so its SDK client (and that
+    client's connection pool) is reused across extractions.
+    """
     
     providers = {
         "gemini": GeminiProvider,
@@ -1,10 +1,106 @@
 from abc import ABC, abstractmethod
 from typing import TypeVar, Type
-from pydantic import BaseModel
+from functools import lru_cache
+from pydantic import BaseModel, TypeAdapter
+import asyncio
+import json
+import os
+
+# SIMD base64 encoder when installed; same interface as the stdlib module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
 
 T = TypeVar('T', bound=BaseModel)
 
 
+def b64encode_str(data) -> str:
+    """Base64-encode bytes (or any buffer) to an ASCII str"""
+    return base64.b64encode(data).decode("ascii")
+
+
+SCHEMA_SUFFIX = "\n\nRespond with ONLY valid JSON matching this schema:\n"
+
+# Keys under which a schema maps names to sub-schemas (names are kept as-is)
+_SCHEMA_MAPS = ("properties", "$defs")
+
+
+def _is_simple_nullable(options) -> bool:
+    """True for an anyOf of bare scalar types, one of them null"""
+    return (
+        isinstance(options, list)
+        and all(isinstance(o, dict) and o.keys() == {"type"} and isinstance(o["type"], str) for o in options)
+        and any(o["type"] == "null" for o in options)
+    )
+
+
+def _compact_schema(node):
+    """
+    Drop prompt-irrelevant parts of a JSON schema.
+    
+    Auto-generated titles and null defaults are removed and nullable scalar
+    unions become type lists. Descriptions stay, since they carry the field
+    formats the model is asked to follow.
+    """
+    if isinstance(node, list):
+        return [_compact_schema(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    
+    compact = {}
+    for key, value in node.items():
+        if key == "title" or (key == "default" and value is None):
+            continue
+        if key == "anyOf" and _is_simple_nullable(value):
+            # {"anyOf": [{"type": "string"}, {"type": "null"}]} -> {"type": ["string", "null"]}
+            compact["type"] = [option["type"] for option in value]
+        elif key in _SCHEMA_MAPS and isinstance(value, dict):
+            compact[key] = {name: _compact_schema(sub) for name, sub in value.items()}
+        else:
+            compact[key] = _compact_schema(value)
+    return compact
+
+
+@lru_cache(maxsize=None)
+def schema_instructions(response_model: Type[BaseModel]) -> str:
+    """JSON-only response instructions for a model (schema built once per class)"""
+    schema = _compact_schema(response_model.model_json_schema())
+    # Compact separators: the schema is prompt text, so whitespace costs tokens
+    return SCHEMA_SUFFIX + json.dumps(schema, separators=(",", ":"))
+
+
+@lru_cache(maxsize=None)
+def _validator(response_model: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter for a response model, built once per class"""
+    return TypeAdapter(response_model)
+
+
+def validate_json(response_model: Type[T], raw) -> T:
+    """Parse and validate a JSON response body (str or bytes) into response_model"""
+    return _validator(response_model).validate_json(raw)
+
+
+def read_pdf_base64(pdf_path) -> str:
+    """
+    Read a PDF (path, or raw bytes already in memory) and return it base64-encoded.
+    
+    The file is read into one preallocated buffer, and the raw bytes are
+    released before the (ASCII) decode, so peak memory stays near 2x the
+    encoded size instead of holding raw, encoded and str copies at once.
+    """
+    if isinstance(pdf_path, (bytes, bytearray)):
+        return b64encode_str(pdf_path)
+    
+    with open(pdf_path, "rb") as f:
+        buf = bytearray(os.fstat(f.fileno()).st_size)
+        n = f.readinto(buf)
+    
+    encoded = base64.b64encode(memoryview(buf)[:n])
+    del buf
+    return encoded.decode("ascii")
+
+
 class AIProvider(ABC):
     """Abstract base class for AI providers"""
     
@@ -19,7 +115,7 @@ class AIProvider(ABC):
         Extract structured data from PDF
         
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file, or the PDF's raw bytes
             prompt: Extraction prompt
             response_model: Pydantic model for response
             
@@ -28,6 +124,20 @@ class AIProvider(ABC):
         """
         pass
     
+    async def extract_from_pdf_async(
+        self, 
+        pdf_path: str, 
+        prompt: str, 
+        response_model: Type[T]
+    ) -> T:
+        """
+        Async variant of extract_from_pdf.
+        
+        Runs the blocking call in a worker thread by default; providers with an
+        async SDK client override this to await the request directly.
+        """
+        return await asyncio.to_thread(self.extract_from_pdf, pdf_path, prompt, response_model)
+    
     @abstractmethod
     def get_provider_name(self) -> str:
         """Return provider name for logging"""
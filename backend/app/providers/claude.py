@@ -1,9 +1,9 @@
 from typing import Type, TypeVar
 from pydantic import BaseModel
-from anthropic import Anthropic
-from .base import AIProvider
+from anthropic import Anthropic, AsyncAnthropic
+from .base import AIProvider, read_pdf_base64, schema_instructions, validate_json
 from app import config
-import base64
+import asyncio
 
 T = TypeVar('T', bound=BaseModel)
 
@@ -11,15 +11,15 @@ T = TypeVar('T', bound=BaseModel)
 class ClaudeProvider(AIProvider):
     def __init__(self):
         self.client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+        self.async_client = None  # created on first async call
         self.model = config.MODELS["claude"]
     
-    def extract_from_pdf(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
+    def _request(self, pdf_path: str, prompt: str, response_model: Type[T]) -> dict:
+        """Build messages.create arguments for a PDF extraction"""
         # Read and encode PDF
-        with open(pdf_path, "rb") as f:
-            pdf_data = base64.standard_b64encode(f.read()).decode("utf-8")
+        pdf_data = read_pdf_base64(pdf_path)
         
-        # Create message
-        response = self.client.messages.create(
+        return dict(
             model=self.model,
             max_tokens=4096,
             messages=[{
@@ -35,17 +35,31 @@ class ClaudeProvider(AIProvider):
                     },
                     {
                         "type": "text",
-                        "text": prompt + f"\n\nRespond with ONLY valid JSON matching this schema:\n{response_model.model_json_schema()}"
+                        "text": prompt + schema_instructions(response_model)
                     }
                 ]
             }]
         )
+    
+    def extract_from_pdf(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
+        # Create message
+        response = self.client.messages.create(**self._request(pdf_path, prompt, response_model))
         
         # Extract JSON from response
         json_text = response.content[0].text
         
         # Parse response
-        return response_model.model_validate_json(json_text)
+        return validate_json(response_model, json_text)
+    
+    async def extract_from_pdf_async(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
+        if self.async_client is None:
+            self.async_client = AsyncAnthropic(api_key=config.ANTHROPIC_API_KEY)
+        
+        # File read and base64 encoding stay off the event loop
+        request = await asyncio.to_thread(self._request, pdf_path, prompt, response_model)
+        response = await self.async_client.messages.create(**request)
+        
+        return validate_json(response_model, response.content[0].text)
     
     def get_provider_name(self) -> str:
         return "Claude"
@@ -1,8 +1,9 @@
 from typing import Type, TypeVar
 from pydantic import BaseModel
 from google import genai
-from .base import AIProvider
+from .base import AIProvider, validate_json
 from app import config
+import io
 
 T = TypeVar('T', bound=BaseModel)
 
@@ -13,8 +14,11 @@ class GeminiProvider(AIProvider):
         self.model = config.MODELS["gemini"]
     
     def extract_from_pdf(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
-        # Upload PDF
-        pdf = self.client.files.upload(file=pdf_path)
+        # Upload PDF (from disk, or from bytes already in memory)
+        if isinstance(pdf_path, (bytes, bytearray)):
+            pdf = self.client.files.upload(file=io.BytesIO(pdf_path), config={"mime_type": "application/pdf"})
+        else:
+            pdf = self.client.files.upload(file=pdf_path)
         
         # Generate content
         response = self.client.models.generate_content(
@@ -27,7 +31,7 @@ class GeminiProvider(AIProvider):
         )
         
         # Parse response
-        return response_model.model_validate_json(response.text)
+        return validate_json(response_model, response.text)
     
     def get_provider_name(self) -> str:
         return "Gemini"
@@ -1,64 +1,180 @@
 from typing import Type, TypeVar
 from pydantic import BaseModel
 from groq import Groq
-from .base import AIProvider
+from .base import AIProvider, b64encode_str, schema_instructions, validate_json
 from app import config
-import base64
-import fitz  # PyMuPDF
-import io
-from PIL import Image
+from app.pdf_utils import open_pdf
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 
 T = TypeVar('T', bound=BaseModel)
 
 
+def _render_pages(pdf_path, page_numbers) -> list[str]:
+    """Render the given pages to base64 JPEGs (also runs in worker processes)"""
+    images = []
+    
+    with open_pdf(pdf_path) as doc:
+        for page_num in page_numbers:
+            page = doc[page_num]
+            # Render just enough pixels for the model: the DPI that gives
+            # TARGET_LONG_EDGE px on the page's long side, capped for OCR quality
+            long_edge = max(page.rect.width, page.rect.height)
+            dpi = min(config.MAX_RENDER_DPI, int(72 * config.TARGET_LONG_EDGE / long_edge))
+            pix = page.get_pixmap(dpi=dpi)
+            
+            # Encode to JPEG inside MuPDF (no PIL copy), then base64
+            jpeg = pix.tobytes(output="jpeg", jpg_quality=95)
+            images.append(b64encode_str(jpeg))
+    
+    return images
+
+
+def _layout_text(words) -> str:
+    """
+    Page text with column positions kept, one output line per visual line.
+    
+    Words (as from page.get_text("words")) are placed at the character column
+    matching their x position, so table columns (e.g. withdrawal vs deposit)
+    stay aligned as in the PDF.
+    """
+    if not words:
+        return ""
+    
+    # Average glyph width on the page sets the text grid; the margin is dropped
+    char_width = sum(w[2] - w[0] for w in words) / sum(len(w[4]) for w in words)
+    left = min(w[0] for w in words)
+    
+    # Group words into visual lines by vertical overlap with the line's first word
+    lines = []
+    for x0, y0, x1, y1, text, *_ in sorted(words, key=lambda w: (w[1], w[0])):
+        if lines and y0 < (lines[-1][0] + lines[-1][1]) / 2:
+            lines[-1][2].append((x0, text))
+        else:
+            lines.append((y0, y1, [(x0, text)]))
+    
+    rendered = []
+    for _, _, line_words in lines:
+        line = ""
+        for x0, text in sorted(line_words):
+            column = int((x0 - left) / char_width)
+            line = line.ljust(column if column > len(line) else len(line) + bool(line)) + text
+        rendered.append(line.rstrip())
+    
+    return "\n".join(rendered)
+
+
+@lru_cache(maxsize=1)
+def _render_pool() -> ProcessPoolExecutor:
+    """
+    Long-lived pool for page rendering, started on first use.
+    
+    Workers are spawned rather than forked: extraction may run in a worker
+    thread of a multi-threaded server, where forking can deadlock.
+    """
+    return ProcessPoolExecutor(
+        max_workers=min(os.cpu_count() or 1, 8),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
 class GroqProvider(AIProvider):
+    # Below this many pages, shipping the PDF to worker processes costs more than it saves
+    PARALLEL_MIN_PAGES = 8
+    # Pages with at least this much extractable text are sent as text, not images
+    TEXT_PAGE_MIN_CHARS = 200
+    
     def __init__(self):
         self.client = Groq(api_key=config.GROQ_API_KEY)
         self.model = config.MODELS["groq"]
     
-    def _pdf_to_images(self, pdf_path: str) -> list[str]:
-        """Convert PDF pages to base64 images"""
-        doc = fitz.open(pdf_path)
-        images = []
+    def _split_pages(self, pdf_path, allow_text: bool = True) -> tuple[dict[int, str], list[int]]:
+        """
+        Split pages into born-digital and scanned ones.
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            # Render page to image (higher DPI for better OCR)
-            pix = page.get_pixmap(dpi=200)
-            
-            # Convert to PIL Image
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            img.save(buffer, format="JPEG", quality=95)
-            img_base64 = base64.b64encode(buffer.getvalue()).decode()
-            images.append(img_base64)
+        Args:
+            pdf_path: Path to PDF file, PDF bytes or an open document
+            allow_text: False to rasterize every page (e.g. when bounding boxes are needed)
+        
+        Returns:
+            (column-preserving text of each text-heavy page by page index,
+             indices of pages to rasterize)
+        """
+        text_pages = {}
+        image_pages = []
         
-        doc.close()
-        return images
+        with open_pdf(pdf_path) as doc:
+            for page_num, page in enumerate(doc):
+                words = page.get_text("words", sort=True) if allow_text else []
+                # Count real characters only; layout padding must not turn a
+                # scanned page with a short text header into a "text" page
+                if sum(len(w[4]) for w in words) >= self.TEXT_PAGE_MIN_CHARS:
+                    text_pages[page_num] = _layout_text(words)
+                else:
+                    image_pages.append(page_num)
+        
+        return text_pages, image_pages
+    
+    def _pdf_to_images(self, pdf_path, page_numbers: list[int] = None) -> list[str]:
+        """Convert PDF pages (from a path or PDF bytes) to base64 images"""
+        if page_numbers is None:
+            with open_pdf(pdf_path) as doc:
+                page_numbers = list(range(len(doc)))
+        
+        page_count = len(page_numbers)
+        workers = min(os.cpu_count() or 1, 8, page_count)
+        if page_count < self.PARALLEL_MIN_PAGES or workers < 2:
+            return _render_pages(pdf_path, page_numbers)
+        
+        # MuPDF is not thread-safe, so contiguous page ranges are rendered in
+        # separate processes, each with its own document handle
+        size = -(-page_count // workers)
+        chunks = [page_numbers[start:start + size] for start in range(0, page_count, size)]
+        
+        try:
+            results = _render_pool().map(_render_pages, [pdf_path] * len(chunks), chunks)
+            return [img for chunk_images in results for img in chunk_images]
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool next time and render here
+            _render_pool.cache_clear()
+            return _render_pages(pdf_path, page_numbers)
     
     def extract_from_pdf(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
-        # Convert PDF to images
-        print("   Converting PDF to images...")
-        images = self._pdf_to_images(pdf_path)
+        # Born-digital pages go in as their text layer; only scanned pages are
+        # rasterized. Layout (bounding box) requests need every page as an image
+        wants_layout = "layout" in response_model.model_fields
+        text_pages, image_pages = self._split_pages(pdf_path, allow_text=not wants_layout)
+        
+        images = {}
+        if image_pages:
+            print(f"   Converting {len(image_pages)} scanned page(s) to images...")
+            images = dict(zip(image_pages, self._pdf_to_images(pdf_path, image_pages)))
         
         # Build content with all pages
         content = [
             {
                 "type": "text",
-                "text": prompt + f"\n\nRespond with ONLY valid JSON matching this schema:\n{response_model.model_json_schema()}"
+                "text": prompt + schema_instructions(response_model)
             }
         ]
         
-        # Add all page images
-        for i, img_base64 in enumerate(images):
-            content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{img_base64}"
-                }
-            })
+        # Add pages in document order
+        for page_num in sorted(text_pages.keys() | images.keys()):
+            if page_num in text_pages:
+                content.append({
+                    "type": "text",
+                    "text": f"--- Page {page_num + 1} ---\n{text_pages[page_num]}"
+                })
+            else:
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{images[page_num]}"
+                    }
+                })
         
         # Create chat completion
         completion = self.client.chat.completions.create(
@@ -70,7 +186,7 @@ class GroqProvider(AIProvider):
         
         # Parse response
         json_text = completion.choices[0].message.content
-        return response_model.model_validate_json(json_text)
+        return validate_json(response_model, json_text)
     
     def get_provider_name(self) -> str:
         return "Groq"
@@ -1,9 +1,9 @@
 from typing import Type, TypeVar
 from pydantic import BaseModel
-from openai import OpenAI
-from .base import AIProvider
+from openai import OpenAI, AsyncOpenAI
+from .base import AIProvider, read_pdf_base64
 from app import config
-import base64
+import asyncio
 
 T = TypeVar('T', bound=BaseModel)
 
@@ -11,15 +11,15 @@ T = TypeVar('T', bound=BaseModel)
 class OpenAIProvider(AIProvider):
     def __init__(self):
         self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+        self.async_client = None  # created on first async call
         self.model = config.MODELS["openai"]
     
-    def extract_from_pdf(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
+    def _request(self, pdf_path: str, prompt: str, response_model: Type[T]) -> dict:
+        """Build structured-output completion arguments for a PDF extraction"""
         # Read and encode PDF
-        with open(pdf_path, "rb") as f:
-            pdf_data = base64.standard_b64encode(f.read()).decode("utf-8")
+        pdf_data = read_pdf_base64(pdf_path)
         
-        # Create completion with structured output
-        completion = self.client.beta.chat.completions.parse(
+        return dict(
             model=self.model,
             messages=[
                 {
@@ -40,6 +40,20 @@ class OpenAIProvider(AIProvider):
             ],
             response_format=response_model
         )
+    
+    def extract_from_pdf(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
+        # Create completion with structured output
+        completion = self.client.beta.chat.completions.parse(**self._request(pdf_path, prompt, response_model))
+        
+        return completion.choices[0].message.parsed
+    
+    async def extract_from_pdf_async(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
+        if self.async_client is None:
+            self.async_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+        
+        # File read and base64 encoding stay off the event loop
+        request = await asyncio.to_thread(self._request, pdf_path, prompt, response_model)
+        completion = await self.async_client.beta.chat.completions.parse(**request)
         
         return completion.choices[0].message.parsed
     
@@ -1,9 +1,8 @@
 from typing import Type, TypeVar
 from pydantic import BaseModel
 from openai import OpenAI
-from .base import AIProvider
+from .base import AIProvider, read_pdf_base64, validate_json
 from app import config
-import base64
 
 T = TypeVar('T', bound=BaseModel)
 
@@ -19,8 +18,7 @@ class OpenRouterProvider(AIProvider):
     
     def extract_from_pdf(self, pdf_path: str, prompt: str, response_model: Type[T]) -> T:
         print(f"🔍 DEBUG: Using model: {self.model}")
-        with open(pdf_path, "rb") as f:
-            pdf_data = base64.b64encode(f.read()).decode("utf-8")
+        pdf_data = read_pdf_base64(pdf_path)
         
         completion = self.client.chat.completions.create(
             model=self.model,
@@ -42,7 +40,8 @@ class OpenRouterProvider(AIProvider):
         )
         
         # Validate into Pydantic model (same pattern)
-        return response_model.model_validate_json(
+        return validate_json(
+            response_model,
             completion.choices[0].message.content
         )
     
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.analytics import FinancialAnalyzer
+
+
+def make_analyzer(tmp_path, withdrawals):
+    transactions = [
+        {"date": f"{i % 28 + 1:02d}/01/2024", "description": f"TX{i}", "withdrawal": w, "deposit": 0, "balance": 0}
+        for i, w in enumerate(withdrawals)
+    ]
+    path = tmp_path / "transactions.json"
+    path.write_text(json.dumps({"transactions": transactions}))
+    return FinancialAnalyzer(str(path))
+
+
+def expected_top(analyzer, n):
+    return analyzer.df.nlargest(n, 'withdrawal')[['date', 'description', 'withdrawal']].to_dict('records')
+
+
+def test_top_expenses_ties_keep_first_rows(tmp_path):
+    # Many rows tied at the cutoff value: the earliest ones must be picked
+    withdrawals = [100, 500, 250, 250, 900, 250, 250, 40, 250, 500, 250, 250]
+    analyzer = make_analyzer(tmp_path, withdrawals)
+    
+    top = analyzer.top_expenses(5)
+    assert [row['description'] for row in top] == ['TX4', 'TX1', 'TX9', 'TX2', 'TX3']
+    assert top == expected_top(analyzer, 5)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_top_expenses_matches_nlargest(tmp_path, seed):
+    rng = np.random.default_rng(seed)
+    withdrawals = rng.integers(0, 6, size=60).astype(float) * 100
+    analyzer = make_analyzer(tmp_path, withdrawals.tolist())
+    
+    for n in (1, 3, 10, 60, 100):
+        assert analyzer.top_expenses(n) == expected_top(analyzer, n)
+
+
+def test_full_report_is_identical_on_cache_miss_and_hit(tmp_path, monkeypatch):
+    from app import config
+    from app.api import convert_timestamps
+    monkeypatch.setattr(config, "CACHE_DIR", tmp_path / "cache")
+    
+    # One unparseable date (NaT) must not break the report or its consumers
+    analyzer = make_analyzer(tmp_path, [120.5, 40, 999, 0])
+    analyzer.df.loc[2, 'date'] = None
+    analyzer._days = analyzer.df['date'].to_numpy(dtype='datetime64[D]')
+    
+    fresh = analyzer.generate_full_report()
+    cached = make_analyzer(tmp_path, [120.5, 40, 999, 0]).generate_full_report()
+    
+    assert fresh == cached
+    assert json.loads(json.dumps(fresh)) == fresh
+    assert fresh['top_expenses'][0]['date'] is None
+    assert convert_timestamps(fresh) == fresh
@@ -0,0 +1,31 @@
+import fitz
+
+from app.main import detect_document_type
+
+
+def make_pdf(lines) -> bytes:
+    """Single page with (y, text) lines"""
+    doc = fitz.open()
+    page = doc.new_page()
+    for y, text in lines:
+        page.insert_text((50, y), text, fontsize=10)
+    return doc.tobytes()
+
+
+def test_bank_statement():
+    assert detect_document_type(make_pdf([(60, "STATEMENT OF ACCOUNT"), (400, "Opening Balance 100.00")])) == "bank_statement"
+
+
+def test_invoice():
+    assert detect_document_type(make_pdf([(60, "TAX INVOICE"), (400, "Total 1,200.00")])) == "invoice"
+
+
+def test_header_breaks_ties():
+    # Invoice title with a balance line lower down
+    assert detect_document_type(make_pdf([(60, "Invoice #123"), (700, "Closing balance carried forward")])) == "invoice"
+    # Statement title with an invoice mention in the body
+    assert detect_document_type(make_pdf([(60, "Bank Statement"), (500, "Electricity bill payment")])) == "bank_statement"
+
+
+def test_no_indicators_defaults_to_bank_statement():
+    assert detect_document_type(make_pdf([(60, "Hello world")])) == "bank_statement"
@@ -0,0 +1,62 @@
+import fitz
+import pytest
+
+from app.providers.groq import GroqProvider, _layout_text
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    return GroqProvider()
+
+
+def scanned_page_with_header() -> bytes:
+    """One page that is a full-page image apart from a short, wide text header"""
+    doc = fitz.open()
+    page = doc.new_page()
+    scan = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 200, 260), 0)
+    scan.clear_with(200)
+    page.insert_image(fitz.Rect(36, 80, 576, 760), pixmap=scan)
+    page.insert_text((36, 40), "ACME BANK LTD", fontsize=8)
+    page.insert_text((300, 40), "Statement of Account", fontsize=8)
+    page.insert_text((520, 40), "Page 1 of 3", fontsize=8)
+    page.insert_text((450, 780), "Computer generated", fontsize=8)
+    return doc.tobytes()
+
+
+def test_short_header_on_scanned_page_is_rasterized(provider):
+    pdf = scanned_page_with_header()
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        words = doc[0].get_text("words", sort=True)
+    
+    # Column padding alone would push the header past the threshold
+    assert sum(len(w[4]) for w in words) < provider.TEXT_PAGE_MIN_CHARS
+    assert len(_layout_text(words).strip()) >= provider.TEXT_PAGE_MIN_CHARS
+    
+    text_pages, image_pages = provider._split_pages(pdf)
+    assert text_pages == {}
+    assert image_pages == [0]
+
+
+def test_text_heavy_page_is_sent_as_text(provider):
+    doc = fitz.open()
+    page = doc.new_page()
+    for i in range(30):
+        page.insert_text((36, 60 + i * 14), f"0{i % 9 + 1}/02/24  UPI PAYMENT {i}", fontsize=8)
+        page.insert_text((400, 60 + i * 14), f"{100 + i}.00", fontsize=8)
+    
+    text_pages, image_pages = provider._split_pages(doc.tobytes())
+    assert list(text_pages) == [0]
+    assert image_pages == []
+    assert text_pages[0].startswith("01/02/24")
+
+
+def test_layout_requests_rasterize_every_page(provider):
+    doc = fitz.open()
+    page = doc.new_page()
+    for i in range(30):
+        page.insert_text((36, 60 + i * 14), f"Line item number {i} description", fontsize=8)
+    
+    text_pages, image_pages = provider._split_pages(doc.tobytes(), allow_text=False)
+    assert text_pages == {}
+    assert image_pages == [0]
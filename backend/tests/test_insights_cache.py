@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app import config
+from app.ai_insights import FinancialInsightsAgent
+
+REPORT = {"summary": {"total_withdrawal": 100.0}}
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", tmp_path)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    return FinancialInsightsAgent(provider="claude")
+
+
+def test_empty_insights_are_not_cached(agent, monkeypatch):
+    replies = iter(["", "# Insights"])
+    
+    async def fake_complete(system, prompt, max_tokens, model=None):
+        return next(replies)
+    
+    monkeypatch.setattr(agent, "_complete", fake_complete)
+    
+    assert asyncio.run(agent.generate_insights(REPORT)) == ""
+    assert asyncio.run(agent.generate_insights(REPORT)) == "# Insights"
+    assert asyncio.run(agent.generate_insights(REPORT)) == "# Insights"
+
+
+def test_empty_streamed_insights_are_not_cached(agent, monkeypatch):
+    replies = iter([[], ["# Stream", "ed"]])
+    
+    async def fake_stream(system, prompt, max_tokens, model=None):
+        for chunk in next(replies):
+            yield chunk
+    
+    async def collect():
+        return "".join([chunk async for chunk in agent.stream_insights(REPORT)])
+    
+    monkeypatch.setattr(agent, "_stream", fake_stream)
+    
+    assert asyncio.run(collect()) == ""
+    assert asyncio.run(collect()) == "# Streamed"
+    assert asyncio.run(collect()) == "# Streamed"
+
+
+def test_report_blocks_are_bounded(agent):
+    from app.ai_insights import REPORT_BLOCK_CACHE_SIZE
+    
+    first = agent._report_block({"n": 0}, "r0")
+    for i in range(1, REPORT_BLOCK_CACHE_SIZE * 3):
+        agent._report_block({"n": i}, f"r{i}")
+        agent._report_block({"n": 0}, "r0")  # keep the first report recently used
+    
+    assert len(agent._report_blocks) == REPORT_BLOCK_CACHE_SIZE
+    assert agent._report_blocks["r0"] is first
+    assert "r1" not in agent._report_blocks
@@ -74,6 +74,7 @@ def upload_file(file):
         st.error(f"Connection error: {e}")
         return None
 
+@st.cache_data(ttl=30, show_spinner=False)
 def get_transactions():
     try:
         response = requests.get(f"{API_URL}/api/transactions")
@@ -83,6 +84,7 @@ def get_transactions():
     except Exception:
         return None
 
+@st.cache_data(ttl=300, show_spinner=False)
 def run_analysis():
     try:
         response = requests.get(f"{API_URL}/api/analysis")
@@ -95,15 +97,45 @@ def run_analysis():
         st.error(f"Connection error: {e}")
         return None
 
-def chat_with_agent(message):
+def stream_chat_with_agent(message):
+    """Yield answer text chunks from the backend's Server-Sent Events chat stream"""
     try:
-        response = requests.post(f"{API_URL}/api/chat", json={"message": message})
-        if response.status_code == 200:
-            return response.json().get("response")
-        else:
-            return f"Error: {response.text}"
+        with requests.post(f"{API_URL}/api/chat/stream", json={"message": message}, stream=True) as response:
+            if response.status_code != 200:
+                yield f"Error: {response.text}"
+                return
+            
+            response.encoding = "utf-8"
+            event, data = None, []
+            # chunk_size=None hands over lines as soon as they arrive
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(": ")
+                    if field == "event":
+                        event = value
+                    elif field == "data":
+                        data.append(value)
+                    continue
+                
+                # Blank line ends an event
+                text = "\n".join(data)
+                if event == "error":
+                    yield f"Error: {text}"
+                    return
+                if event == "done":
+                    return
+                yield text
+                event, data = None, []
     except Exception as e:
-        return f"Connection error: {e}"
+        yield f"Connection error: {e}"
+
+@st.cache_data(show_spinner=False)
+def transactions_frame(transactions_json: str) -> pd.DataFrame:
+    """Display-ready transactions table, cached on the JSON text so reruns skip date parsing"""
+    df = pd.DataFrame(json.loads(transactions_json))
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'], format='%d/%m/%Y', errors='coerce').dt.date
+    return df
 
 # -----------------------------------------------------------------------------
 # UI Components
@@ -114,6 +146,7 @@ def sidebar():
     
     st.sidebar.markdown("### Actions")
     if st.sidebar.button("Refresh Data"):
+        get_transactions.clear()
         data = get_transactions()
         if data:
             st.session_state.data = data
@@ -126,6 +159,8 @@ def sidebar():
             if analysis:
                 st.session_state.analysis = analysis
                 st.rerun()
+            else:
+                run_analysis.clear()  # don't keep serving the failure
 
 def dashboard():
     st.markdown('<div class="main-header">Dashboard</div>', unsafe_allow_html=True)
@@ -145,6 +180,9 @@ def dashboard():
                 with st.spinner("Uploading and extracting..."):
                     result = upload_file(uploaded_file)
                     if result:
+                        # New data on the backend: drop cached API responses
+                        get_transactions.clear()
+                        run_analysis.clear()
                         st.success(f"Processed as {result.get('doc_type', 'unknown')}")
                         st.session_state.data = result.get('data')
                         st.rerun()
@@ -171,14 +209,9 @@ def dashboard():
     # Transactions
     st.subheader("Recent Transactions")
     transactions = data.get('transactions', [])
-    df = pd.DataFrame(transactions)
+    display_df = transactions_frame(json.dumps(transactions))
     
-    if not df.empty:
-        # Format for display
-        display_df = df.copy()
-        if 'date' in display_df.columns:
-            display_df['date'] = pd.to_datetime(display_df['date'], format='%d/%m/%Y', errors='coerce').dt.date
-        
+    if not display_df.empty:
         st.dataframe(
             display_df[['date', 'description', 'withdrawal', 'deposit', 'balance']], 
             use_container_width=True,
@@ -244,18 +277,25 @@ def chat_interface():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Get response
-        with st.spinner("Thinking..."):
-            response = chat_with_agent(prompt)
+        # Stream the response as it is generated
+        with st.chat_message("assistant"):
+            response = st.write_stream(stream_chat_with_agent(prompt))
         
         # Add assistant message
         st.session_state.chat_history.append({"role": "assistant", "content": response})
-        with st.chat_message("assistant"):
-            st.markdown(response)
 
 # -----------------------------------------------------------------------------
 # Main App Structure
 # -----------------------------------------------------------------------------
+# On load logic: once per session, before the first render
+if 'bootstrapped' not in st.session_state:
+    st.session_state.bootstrapped = True
+    if st.session_state.data is None:
+        # Try to load existing data
+        data = get_transactions()
+        if data and data.get('transactions'):
+            st.session_state.data = data
+
 sidebar()
 
 # Page Routing
@@ -267,10 +307,3 @@ elif page == "Analysis":
     analysis_view()
 elif page == "Chat":
     chat_interface()
-
-# On load logic
-if st.session_state.data is None:
-    # Try to load existing data
-    data = get_transactions()
-    if data and data.get('transactions'):
-        st.session_state.data = data